@@ -0,0 +1,323 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from app.config import settings
+
+Window = Tuple[date, date]
+
+# Invalidations remembered for checking writes of results computed meanwhile;
+# a computation that outlived more of them is not stored
+INVALIDATION_HISTORY = 1000
+
+# Attempts at a Redis write whose watched invalidation keys kept changing
+WATCH_RETRIES = 3
+
+# Covers every window, for clearing the cache
+ALL_DAYS = (date.min, date.max)
+
+class MemoryCacheStore:
+    """
+    In-process LRU store with a TTL per entry. Every entry remembers the
+    date window it was computed for so writes can invalidate by date range.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._sequence = 0
+        # (sequence, first day, last day) of the latest invalidations
+        self._invalidations = deque(maxlen=INVALIDATION_HISTORY)
+
+    async def version(self) -> int:
+        return self._sequence
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, value, _ = entry
+
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float, window: Window, since: int) -> bool:
+        if _invalidated_since(since, self._sequence, self._invalidations, window):
+            return False
+
+        self._entries[key] = (time.monotonic() + ttl, value, window)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return True
+
+    async def invalidate_range(self, start_day: date, end_day: date) -> int:
+        self._sequence += 1
+        self._invalidations.append((self._sequence, start_day, end_day))
+
+        stale = [
+            key for key, (_, _, window) in self._entries.items()
+            if _overlaps(window, start_day, end_day)
+        ]
+
+        for key in stale:
+            del self._entries[key]
+
+        return len(stale)
+
+    async def clear(self):
+        await self.invalidate_range(*ALL_DAYS)
+        self._entries.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+class RedisCacheStore:
+    """
+    Store backed by any client exposing the ``redis.asyncio`` API.
+
+    Values are JSON encoded and expire through Redis TTLs; LRU eviction is
+    left to the server's ``maxmemory-policy``. Entries are indexed in a
+    sorted set of ``key|first day|last day`` members scored by expiry time,
+    so that date-range invalidation works across workers and the index
+    only ever holds live entries: expired members are dropped before each
+    invalidation.
+
+    Invalidations are numbered by a shared counter and their ranges kept in
+    a second sorted set scored by number. A write checks, under WATCH, that
+    no invalidation of its window was numbered after the one its value was
+    computed at, whichever worker invalidated.
+    """
+
+    def __init__(self, client, prefix: str = "analytics:"):
+        self.client = client
+        self.prefix = prefix
+        self.index_key = f"{prefix}expiry"
+        self.sequence_key = f"{prefix}invalidation_sequence"
+        self.invalidations_key = f"{prefix}invalidations"
+
+    async def version(self) -> int:
+        return int(await self.client.get(self.sequence_key) or 0)
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self.client.get(self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float, window: Window, since: int) -> bool:
+        from redis.exceptions import WatchError
+
+        ttl = max(1, int(ttl))
+        member = f"{key}|{window[0].isoformat()}|{window[1].isoformat()}"
+        data = json.dumps(value, default=_json_default)
+
+        for _ in range(WATCH_RETRIES):
+            async with self.client.pipeline(transaction=True) as pipe:
+                try:
+                    # An invalidation recorded between the check and the write aborts it
+                    await pipe.watch(self.sequence_key, self.invalidations_key)
+                    sequence = int(await pipe.get(self.sequence_key) or 0)
+                    invalidations = [
+                        _parse_member(member)
+                        for member in await pipe.zrangebyscore(self.invalidations_key, f"({since}", "+inf")
+                    ]
+
+                    if _invalidated_since(since, sequence, invalidations, window):
+                        return False
+
+                    pipe.multi()
+                    pipe.set(self.prefix + key, data, ex=ttl)
+                    pipe.zadd(self.index_key, {member: time.time() + ttl})
+                    await pipe.execute()
+
+                    return True
+                except WatchError:
+                    continue
+
+        return False
+
+    async def invalidate_range(self, start_day: date, end_day: date) -> int:
+        # Recorded first: writes checking from here on see it, and earlier
+        # ones are deleted below
+        sequence = await self.client.incr(self.sequence_key)
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.invalidations_key, {f"{sequence}|{start_day.isoformat()}|{end_day.isoformat()}": sequence})
+            pipe.zremrangebyscore(self.invalidations_key, "-inf", sequence - INVALIDATION_HISTORY)
+            await pipe.execute()
+
+        # Removing by score is atomic, so an entry stored again meanwhile
+        # (same member, later expiry) stays indexed
+        await self.client.zremrangebyscore(self.index_key, "-inf", time.time())
+        members = await self.client.zrange(self.index_key, 0, -1)
+        stale = []
+
+        for member in members:
+            member = member.decode() if isinstance(member, bytes) else member
+            key, first, last = member.rsplit("|", 2)
+
+            if _overlaps((date.fromisoformat(first), date.fromisoformat(last)), start_day, end_day):
+                stale.append((key, member))
+
+        if stale:
+            await self.client.delete(*[self.prefix + key for key, _ in stale])
+            await self.client.zrem(self.index_key, *[member for _, member in stale])
+
+        return len(stale)
+
+    async def clear(self):
+        await self.invalidate_range(*ALL_DAYS)
+        members = await self.client.zrange(self.index_key, 0, -1)
+
+        if members:
+            keys = [
+                self.prefix + (member.decode() if isinstance(member, bytes) else member).rsplit("|", 2)[0]
+                for member in members
+            ]
+            await self.client.delete(*keys)
+
+        await self.client.delete(self.index_key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+class AnalyticsCache:
+    """
+    Read-through cache for analytics results.
+
+    Concurrent misses on the same key share one computation, and a result
+    computed while an invalidation of its window happened, in any worker
+    sharing the store, is returned but not stored.
+    """
+
+    def __init__(self, store, ttl: float = 60):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self._inflight = {}
+
+    async def get_or_compute(self, key: str, window: Window, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await self.store.get(key)
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if key in self._inflight:
+            self.coalesced += 1
+            leader = self._inflight[key]
+
+            try:
+                return await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                # Only the leader's request was cancelled: compute it again
+                if not leader.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+            return await self.get_or_compute(key, window, compute)
+
+        self.misses += 1
+        since = await self.store.version()
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved even when nobody else is waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+
+        try:
+            value = await compute()
+            await self.store.set(key, value, self.ttl, window, since)
+
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def invalidate_range(self, start_day: date, end_day: date):
+        self.invalidations += await self.store.invalidate_range(start_day, end_day)
+
+    async def invalidate_timestamps(self, timestamps):
+        """
+        Invalidate entries covering the given sale timestamps. The range is
+        widened by a day on each side to absorb timezone differences between
+        request windows and stored timestamps.
+        """
+        days = [timestamp.date() for timestamp in timestamps if timestamp]
+
+        if days:
+            await self.invalidate_range(min(days) - timedelta(days=1), max(days) + timedelta(days=1))
+
+    async def clear(self):
+        await self.store.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "entries": self.store.size(),
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+def _overlaps(window: Window, start_day: date, end_day: date) -> bool:
+    return window[0] <= end_day and start_day <= window[1]
+
+def _invalidated_since(since: int, sequence: int, invalidations, window: Window) -> bool:
+    """
+    Whether an invalidation numbered after ``since`` covers ``window``.
+    ``invalidations`` holds (sequence, first day, last day) of at least the
+    latest ones; when those after ``since`` are no longer all there, assume so.
+    """
+    newer = [(first, last) for number, first, last in invalidations if number > since]
+
+    if len(newer) < sequence - since:
+        return True
+
+    return any(_overlaps(window, first, last) for first, last in newer)
+
+def _parse_member(member) -> tuple:
+    member = member.decode() if isinstance(member, bytes) else member
+    sequence, first, last = member.split("|")
+
+    return int(sequence), date.fromisoformat(first), date.fromisoformat(last)
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def create_store():
+    redis_url = settings.analytics_cache_redis_url
+
+    if not redis_url:
+        return MemoryCacheStore(settings.analytics_cache_max_entries)
+
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise RuntimeError("ANALYTICS_CACHE_REDIS_URL is set but the 'redis' package is not installed")
+
+    return RedisCacheStore(redis.from_url(redis_url))
+
+analytics_cache = AnalyticsCache(create_store(), ttl=settings.analytics_cache_ttl)
@@ -0,0 +1,69 @@
+from typing import Optional
+from pydantic import BaseSettings
+
+class Settings(BaseSettings):
+    """
+    Application settings, read from the environment (or a .env file).
+    Field names map to upper-case environment variables.
+    """
+    database_url: str
+    # Optional read replica for analytics and GET endpoints, primary when unset
+    read_database_url: Optional[str] = None
+    # Seconds a client's reads stay on the primary after its own write (0 disables)
+    read_your_writes_seconds: float = 0.0
+    database_ssl: bool = False
+    database_echo: bool = False
+
+    # Connection pool tuning
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30.0
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+
+    # asyncpg prepared statement cache (statements per connection, 0 disables)
+    database_statement_cache_size: int = 1024
+
+    # Readiness probe: seconds allowed for a pooled connection plus a round
+    # trip, and the recent pool wait (seconds) above which the worker reports
+    # not ready
+    health_check_timeout: float = 1.0
+    health_pool_wait_threshold: float = 0.5
+
+    # Per-request SQL statement count, time and rows (Server-Timing header and
+    # request log); requests issuing more statements than the threshold log
+    # their statement fingerprints (0 disables)
+    query_stats_enabled: bool = True
+    query_log_threshold: int = 0
+
+    # Prometheus metrics on /metrics; with several workers, set a directory
+    # (emptied before startup) where each worker publishes its snapshot
+    metrics_enabled: bool = True
+    metrics_multiprocess_dir: Optional[str] = None
+    metrics_flush_interval: float = 1.0
+
+    analytics_backend: str = "rollup"
+    analytics_cached_source: str = "rollup"
+    analytics_cache_ttl: float = 60.0
+    analytics_cache_max_entries: int = 1024
+    analytics_cache_redis_url: Optional[str] = None
+    analytics_aligned_windows: bool = False
+    # Dashboard fan-out: queries in flight per request and seconds per query
+    analytics_dashboard_concurrency: int = 4
+    analytics_query_timeout: float = 10.0
+
+    # Per-day product sketches behind mode=approx on the product analytics
+    sketch_width: int = 1024
+    sketch_depth: int = 4
+    sketch_top_k: int = 128
+    sketch_retention_days: int = 400
+    # Loaded on startup and saved on shutdown when set
+    sketch_path: Optional[str] = None
+
+    # Output directory of the incremental Parquet export
+    export_dir: str = "exports"
+
+    class Config:
+        env_file = ".env"
+
+settings = Settings()
@@ -1,47 +1,192 @@
-import os
+import time
+import asyncpg
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from dotenv import load_dotenv
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-# Load environment variables
-load_dotenv()
+from app.config import settings
+from app.instrumentation import instrument_engine
 
-# Get database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Cookie recording the time of a client's last write, for read-your-writes
+LAST_WRITE_COOKIE = "last_write"
 
-# Convert the URL to an async version
-ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+# Request state flag set by get_db: the request used a primary (write) session
+WROTE_STATE = "wrote_primary"
 
-# Remove sslmode parameter as asyncpg doesn't support it directly
-if "sslmode=" in ASYNC_DATABASE_URL:
-    ASYNC_DATABASE_URL = ASYNC_DATABASE_URL.split("?")[0]
+def to_async_url(url: str) -> str:
+    # Convert the URL to an async version
+    async_url = url.replace("postgresql://", "postgresql+asyncpg://")
+
+    # Remove sslmode parameter as asyncpg doesn't support it directly
+    if "sslmode=" in async_url:
+        async_url = async_url.split("?")[0]
+
+    return async_url
+
+# Get database URL from settings
+DATABASE_URL = settings.database_url
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
 
 # Create engine with SSL if needed
-connect_args = {}
-if os.getenv("DATABASE_SSL", "false").lower() == "true":
+connect_args = {
+    "prepared_statement_cache_size": settings.database_statement_cache_size
+}
+if settings.database_ssl:
     connect_args["ssl"] = True
 
+# Weight of the latest checkout in the moving average of pool wait times
+WAIT_SMOOTHING = 0.2
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a connection.
+    ``wait_time_recent`` is an exponential moving average over checkouts,
+    so it follows the current load.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.wait_time_last = 0.0
+        self.wait_time_recent = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_count += 1
+            self.wait_time_total += waited
+            self.wait_time_last = waited
+            self.wait_time_recent += WAIT_SMOOTHING * (waited - self.wait_time_recent)
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.wait_count,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_avg": self.wait_time_total / self.wait_count if self.wait_count else 0.0,
+            "wait_time_max": self.wait_time_max,
+            "wait_time_last": self.wait_time_last,
+            "wait_time_recent": self.wait_time_recent,
+        }
+
+def create_engine(url: str):
+    engine = create_async_engine(
+        url,
+        echo=settings.database_echo,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        pool_pre_ping=settings.database_pool_pre_ping,
+        connect_args=connect_args
+    )
+
+    if settings.query_stats_enabled:
+        instrument_engine(engine)
+
+    return engine
+
 # Create async engine
-engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=True,
-    future=True,
-    connect_args=connect_args
-)
+engine = create_engine(ASYNC_DATABASE_URL)
+
+# Engine for reads; the primary itself when no replica is configured
+if settings.read_database_url:
+    read_engine = create_engine(to_async_url(settings.read_database_url))
+else:
+    read_engine = engine
 
-# Create async session
+# Create async sessions
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+read_async_session = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 # Create base class for models
 Base = declarative_base()
 
+def pool_metrics() -> dict:
+    """
+    Snapshot of the connection pools: occupancy and checkout wait times
+    """
+    metrics = {"primary": engine.sync_engine.pool.metrics()}
+
+    if read_engine is not engine:
+        metrics["read"] = read_engine.sync_engine.pool.metrics()
+
+    return metrics
+
+def engines() -> dict:
+    """
+    The engines by the names pool_metrics reports them under
+    """
+    if read_engine is not engine:
+        return {"primary": engine, "read": read_engine}
+
+    return {"primary": engine}
+
+async def connect_unpooled(engine=engine) -> asyncpg.Connection:
+    """
+    A raw asyncpg connection to the engine's database, outside its pool.
+    For connections held for the life of the process (LISTEN), which would
+    otherwise take a pool slot and count toward its saturation.
+    """
+    url = engine.url
+
+    return await asyncpg.connect(
+        host=url.host,
+        port=url.port,
+        user=url.username,
+        password=url.password,
+        database=url.database,
+        **({"ssl": True} if settings.database_ssl else {})
+    )
+
+def recently_wrote(request: Request) -> bool:
+    """
+    Whether the client wrote within the read-your-writes window
+    """
+    if not settings.read_your_writes_seconds:
+        return False
+
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+
+    return time.time() - last_write < settings.read_your_writes_seconds
+
+def read_session_factory(request: Request):
+    """
+    Session factory for the client's reads: the primary inside its
+    read-your-writes window, the replica otherwise
+    """
+    return async_session if recently_wrote(request) else read_async_session
+
 # Dependency to get a database session
-async def get_db():
+async def get_db(request: Request):
     """
     Dependency function that yields db sessions
     """
+    # Only requests that write take this dependency; mark them for the
+    # read-your-writes cookie
+    setattr(request.state, WROTE_STATE, True)
+
     async with async_session() as session:
         try:
             yield session
@@ -50,4 +195,15 @@ async def get_db():
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db(request: Request):
+    """
+    Dependency function that yields read-only db sessions, from the replica
+    unless the client is inside its read-your-writes window
+    """
+    async with read_session_factory(request)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import async_session
+from app.services.parquet_export_service import ExportInProgress, ParquetExportService
+
+async def export_parquet(output_dir: str):
+    """
+    Export the sales added since the last watermark to Parquet, reading
+    the primary so the watermark never passes unreplicated sales
+    """
+    async with async_session() as session:
+        result = await ParquetExportService(session).export(output_dir)
+
+    print(f"Exported {result['rows']} rows to {len(result['files'])} files, watermark {result['watermark']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental Parquet export of the sales fact table")
+    parser.add_argument("--output", default=settings.export_dir, help="Output directory (holds the watermark)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(export_parquet(args.output))
+    except ExportInProgress as e:
+        sys.exit(str(e))
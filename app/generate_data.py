@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import math
+import random
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from itertools import accumulate
+from multiprocessing import get_context
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import ASYNC_DATABASE_URL, Base, connect_args
+from app.models.category import Category
+from app.models.product import Product
+from app.models.inventory import Inventory
+from app.models.sale import Sale, SaleItem, PaymentMethod
+from app.config import settings
+from app.services.rollup_service import RollupService
+from app.services.sketch_service import SketchService
+from app.sketches import product_sketches
+
+SALE_COLUMNS = [
+    "id", "reference_number", "total_amount", "tax_amount", "discount_amount",
+    "payment_method", "customer_name", "customer_email", "notes", "created_at"
+]
+
+# Item ids come from the sequence, so partitions never have to agree on them
+ITEM_COLUMNS = ["sale_id", "product_id", "quantity", "price", "discount", "total"]
+
+# Secondary indexes are dropped during the load and built once at the end
+DEFERRED_INDEX_TABLES = [Sale.__table__, SaleItem.__table__]
+
+# Relative share of a day's sales per UTC hour
+HOUR_WEIGHTS = list(accumulate([
+    1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 9, 10,
+    11, 10, 9, 9, 10, 11, 12, 12, 10, 7, 4, 2
+]))
+
+ITEMS_PER_SALE = list(accumulate([35, 25, 17, 10, 8, 5]))
+
+PAYMENT_METHOD_NAMES = [method.name for method in PaymentMethod]
+
+def day_random(seed: int, day: date) -> random.Random:
+    # One generator per day: the output depends on the seed and the day only,
+    # never on the number of workers or the batch size
+    return random.Random(f"{seed}:{day.isoformat()}")
+
+def seasonal_factor(day: date, seasonality: float) -> float:
+    """
+    Demand multiplier: busier weekends and a yearly peak in mid-December,
+    scaled by ``seasonality`` (0 disables both).
+    """
+    weekly = 0.3 if day.weekday() >= 5 else -0.12
+    yearly = 0.5 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 350) / 365.25)
+
+    return max(0.05, 1 + seasonality * (weekly + yearly))
+
+def daily_sales(options, day: date, index: int, rng: random.Random) -> int:
+    expected = options.sales_per_day * seasonal_factor(day, options.seasonality)
+    expected *= (1 + options.growth) ** (index / 365)
+
+    return max(0, round(rng.gauss(expected, math.sqrt(expected))))
+
+def generation_days(options):
+    return [options.end - timedelta(days=offset) for offset in range(options.days - 1, -1, -1)]
+
+def build_catalog(options):
+    """
+    Categories, products and inventory rows, plus the cumulative Zipf weights
+    that make a few products account for most of the sales.
+    """
+    rng = random.Random(f"{options.seed}:catalog")
+
+    categories = [
+        (category_id, f"Category {category_id}", f"Generated category {category_id}")
+        for category_id in range(1, options.categories + 1)
+    ]
+
+    products = []
+    inventory = []
+    restocked = datetime.combine(options.end, datetime.min.time(), tzinfo=timezone.utc)
+
+    for product_id in range(1, options.products + 1):
+        price = max(0.99, round(math.exp(rng.uniform(math.log(2), math.log(500)))) - 0.01)
+        sku = f"GEN-{product_id:07d}"
+        products.append((
+            product_id,
+            sku,
+            f"Product {product_id}",
+            f"Generated product {product_id}",
+            price,
+            round(price * rng.uniform(0.4, 0.75), 2),
+            rng.randint(1, options.categories),
+            f"https://example.com/images/{sku.lower()}.jpg"
+        ))
+        inventory.append((
+            product_id,
+            product_id,
+            rng.randint(0, 500),
+            rng.randint(5, 25),
+            restocked - timedelta(days=rng.randint(1, 60))
+        ))
+
+    # Popularity rank is independent of the id, so hot products are spread out
+    ranked = list(range(1, options.products + 1))
+    rng.shuffle(ranked)
+    weights = list(accumulate(1 / rank ** options.skew for rank in range(1, options.products + 1)))
+    prices = {row[0]: row[4] for row in products}
+
+    return categories, products, inventory, ranked, weights, prices
+
+def generate_day(options, day: date, index: int, first_id: int, catalog, sales: list, items: list) -> int:
+    """
+    Append one day of sales and their items to the record lists; returns the
+    number of sales.
+    """
+    _, _, _, ranked, weights, prices = catalog
+    rng = day_random(options.seed, day)
+    count = daily_sales(options, day, index, rng)
+    midnight = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+
+    for sale_id in range(first_id, first_id + count):
+        hour = rng.choices(range(24), cum_weights=HOUR_WEIGHTS)[0]
+        created_at = midnight + timedelta(hours=hour, seconds=rng.random() * 3600)
+        size = rng.choices(range(1, 7), cum_weights=ITEMS_PER_SALE)[0]
+        subtotal = 0.0
+
+        for product_id in set(rng.choices(ranked, cum_weights=weights, k=size)):
+            price = prices[product_id]
+            quantity = rng.choice((1, 1, 1, 2, 2, 3))
+            discount = round(price * rng.choice((0.05, 0.1, 0.15)), 2) if rng.random() < 0.15 else 0.0
+            total = round((price - discount) * quantity, 2)
+            subtotal += total
+            items.append((sale_id, product_id, quantity, price, discount, total))
+
+        tax_amount = round(subtotal * rng.uniform(0.05, 0.1), 2)
+        order_discount = round(subtotal * rng.choice((0.05, 0.1)), 2) if rng.random() < 0.1 else 0.0
+
+        if options.customers and rng.random() < 0.9:
+            customer = rng.randrange(options.customers)
+            name, email = f"Customer {customer}", f"customer{customer}@example.com"
+        else:
+            name = email = None
+
+        sales.append((
+            sale_id,
+            f"GEN-{sale_id:010d}",
+            round(subtotal + tax_amount - order_discount, 2),
+            tax_amount,
+            order_discount,
+            rng.choice(PAYMENT_METHOD_NAMES),
+            name,
+            email,
+            None,
+            created_at
+        ))
+
+    return count
+
+def plan_partitions(options):
+    """
+    Split the days into contiguous ranges of roughly equal sales. Sale ids are
+    assigned in day order, so each range knows its first id up front.
+    """
+    days = generation_days(options)
+    counts = [
+        daily_sales(options, day, index, day_random(options.seed, day))
+        for index, day in enumerate(days)
+    ]
+
+    total = sum(counts)
+    target = max(1, math.ceil(total / (options.workers * 4)))
+    partitions = []
+    start = 0
+    first_id = 1
+    pending = 0
+
+    for index, count in enumerate(counts):
+        pending += count
+
+        if pending >= target or index == len(counts) - 1:
+            partitions.append((start, index + 1, first_id))
+            first_id += pending
+            start = index + 1
+            pending = 0
+
+    return partitions, total
+
+def make_engine():
+    return create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args, poolclass=NullPool)
+
+async def copy_records(connection, table, records, columns):
+    if records:
+        await connection.copy_records_to_table(table, records=records, columns=columns)
+
+async def load_partition_async(options, start: int, stop: int, first_id: int):
+    catalog = build_catalog(options)
+    days = generation_days(options)
+    engine = make_engine()
+    sale_count = item_count = 0
+
+    try:
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            # Generated data can be regenerated, skip waiting for the WAL flush
+            await driver.execute("SET synchronous_commit = off")
+
+            sales, items = [], []
+            next_id = first_id
+
+            for index in range(start, stop):
+                next_id += generate_day(options, days[index], index, next_id, catalog, sales, items)
+
+                if len(sales) >= options.batch_size or index == stop - 1:
+                    async with driver.transaction():
+                        await copy_records(driver, "sales", sales, SALE_COLUMNS)
+                        await copy_records(driver, "sale_items", items, ITEM_COLUMNS)
+
+                    sale_count += len(sales)
+                    item_count += len(items)
+                    sales, items = [], []
+    finally:
+        await engine.dispose()
+
+    return sale_count, item_count
+
+def load_partition(arguments):
+    return asyncio.run(load_partition_async(*arguments))
+
+async def prepare(options):
+    """
+    Recreate the schema and load the catalog
+    """
+    categories, products, inventory, *_ = build_catalog(options)
+    engine = make_engine()
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+            if not options.keep_indexes:
+                for table in DEFERRED_INDEX_TABLES:
+                    for index in table.indexes:
+                        await conn.run_sync(index.drop)
+
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            await copy_records(driver, Category.__tablename__, categories, ["id", "name", "description"])
+            await copy_records(driver, Product.__tablename__, products, [
+                "id", "sku", "name", "description", "price", "cost", "category_id", "image_url"
+            ])
+            await copy_records(driver, Inventory.__tablename__, inventory, [
+                "id", "product_id", "quantity", "low_stock_threshold", "last_restock_date"
+            ])
+    finally:
+        await engine.dispose()
+
+async def finish(options):
+    """
+    Build the deferred indexes, move the sequences past the explicit ids,
+    rebuild the rollups and refresh planner statistics. The product sketches
+    are rebuilt too when SKETCH_PATH is set, since COPY bypasses the sale
+    notifications that keep them current.
+    """
+    engine = make_engine()
+
+    try:
+        async with engine.begin() as conn:
+            if not options.keep_indexes:
+                for table in DEFERRED_INDEX_TABLES:
+                    for index in table.indexes:
+                        started = time.perf_counter()
+                        await conn.run_sync(index.create)
+                        print(f"  index {index.name} built in {time.perf_counter() - started:.1f}s")
+
+            for table in ("categories", "products", "inventory", "sales"):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                ))
+
+        async with sessionmaker(engine, class_=AsyncSession)() as session:
+            await RollupService(session).rebuild()
+            await session.commit()
+
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+
+        if settings.sketch_path:
+            async with sessionmaker(engine, class_=AsyncSession)() as session:
+                items = await SketchService(session).rebuild(product_sketches)
+
+            if product_sketches.save(settings.sketch_path):
+                print(f"  product sketches rebuilt from {items} sale items, saved to {settings.sketch_path}")
+            else:
+                print(f"  {settings.sketch_path} is being saved by another process, product sketches not saved")
+    finally:
+        await engine.dispose()
+
+def generate(options):
+    """
+    Replace the database contents with a synthetic dataset
+    """
+    started = time.perf_counter()
+    partitions, total = plan_partitions(options)
+    print(
+        f"Generating {options.products} products in {options.categories} categories and "
+        f"{total} sales over {options.days} days ({len(partitions)} partitions, {options.workers} workers)"
+    )
+
+    asyncio.run(prepare(options))
+
+    arguments = [(options, start, stop, first_id) for start, stop, first_id in partitions]
+    sale_count = item_count = 0
+    load_started = time.perf_counter()
+
+    # Spawned workers each open their own connection and event loop
+    with ProcessPoolExecutor(options.workers, mp_context=get_context("spawn")) as pool:
+        for sales, items in pool.map(load_partition, arguments):
+            sale_count += sales
+            item_count += items
+
+    elapsed = time.perf_counter() - load_started
+    print(f"Loaded {sale_count} sales and {item_count} sale items in {elapsed:.1f}s ({item_count / max(elapsed, 1e-9):.0f} items/s)")
+
+    asyncio.run(finish(options))
+
+    print(f"Database generated in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replace the database contents with a large synthetic dataset")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--customers", type=int, default=100000, help="Distinct customers, 0 for anonymous sales only")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end", type=date.fromisoformat, default=datetime.now(timezone.utc).date(), help="Last day (YYYY-MM-DD), today by default")
+    parser.add_argument("--sales-per-day", type=float, default=1000, help="Average sales on an ordinary day")
+    parser.add_argument("--seasonality", type=float, default=1.0, help="Strength of the weekly and yearly cycles, 0 for flat demand")
+    parser.add_argument("--growth", type=float, default=0.2, help="Year-over-year growth of the sales volume")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of product popularity, 0 for uniform")
+    parser.add_argument("--seed", type=int, default=42, help="The same seed, --end and --days give the same dataset")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=20000, help="Sales per COPY transaction")
+    parser.add_argument("--keep-indexes", action="store_true", help="Load with the secondary indexes in place")
+    args = parser.parse_args()
+
+    generate(args)
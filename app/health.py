@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engines, pool_metrics
+
+async def probe_engine(engine) -> dict:
+    """
+    Check out a pooled connection and run a round trip on it, timing both.
+    The checkout goes through the pool like any request's, so an exhausted
+    pool shows up here as a slow checkout or a timeout.
+    """
+    started = time.perf_counter()
+
+    async with engine.connect() as conn:
+        checked_out = time.perf_counter()
+        await conn.execute(text("SELECT 1"))
+        finished = time.perf_counter()
+
+    return {
+        "checkout_ms": round((checked_out - started) * 1000, 2),
+        "latency_ms": round((finished - checked_out) * 1000, 2)
+    }
+
+async def check_engine(name: str, engine, pool: dict) -> dict:
+    capacity = pool["size"] + pool["max_overflow"]
+    check = {
+        "ready": True,
+        "saturation": round(pool["checked_out"] / capacity, 3) if capacity else 0.0,
+        "wait_recent_ms": round(pool["wait_time_recent"] * 1000, 2)
+    }
+
+    try:
+        check.update(await asyncio.wait_for(probe_engine(engine), settings.health_check_timeout))
+    except asyncio.TimeoutError:
+        check.update(ready=False, error=f"no connection and round trip within {settings.health_check_timeout}s")
+        return check
+    except Exception as e:
+        check.update(ready=False, error=f"{type(e).__name__}: {e}")
+        return check
+
+    # Shed traffic while requests queue for connections, before they time out
+    if pool["wait_time_recent"] > settings.health_pool_wait_threshold:
+        check.update(ready=False, error=f"pool wait above {settings.health_pool_wait_threshold}s")
+
+    return check
+
+async def readiness() -> dict:
+    """
+    Readiness of every engine (primary and read replica), probed concurrently
+    """
+    pools = pool_metrics()
+    named = engines()
+    results = await asyncio.gather(*(check_engine(name, named[name], pools[name]) for name in named))
+    checks = dict(zip(named, results))
+
+    return {
+        "status": "ready" if all(check["ready"] for check in checks.values()) else "not_ready",
+        "checks": checks
+    }
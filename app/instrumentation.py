@@ -0,0 +1,102 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+class QueryStats:
+    """
+    SQL statements issued on behalf of one request: count, time spent in the
+    database driver and rows returned or affected. Statements also count
+    toward ``parent``, an enclosing collection such as a benchmark driving
+    the app in-process.
+    """
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.rows = 0
+        # Statement text is kept as is; fingerprints are only computed when logged
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float, rows: int):
+        self.count += 1
+        self.duration += duration
+        self.rows += max(rows, 0)
+        self.statements[statement] += 1
+
+        if self.parent is not None:
+            self.parent.record(statement, duration, rows)
+
+    def fingerprints(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        The most frequent statement shapes, literals and parameters removed
+        """
+        shapes = Counter()
+
+        for statement, count in self.statements.items():
+            shapes[fingerprint(statement)] += count
+
+        return shapes.most_common(limit)
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries, {self.rows} rows"'
+
+    def log_fields(self) -> dict:
+        return {
+            "db_statements": self.count,
+            "db_time_ms": round(self.duration * 1000, 2),
+            "db_rows": self.rows
+        }
+
+# Stats of the request being served; tasks it spawns share the same object
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_PARAMETERS = re.compile(r"\$\d+|%\(\w+\)s|%s")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\?(?:::\w+)?(?:\s*,\s*\?(?:::\w+)?)+")
+_REPEATED_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a statement so that executions differing only in their values,
+    or in the length of IN/VALUES lists, share one fingerprint
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _LITERALS.sub("?", statement)
+    statement = _PLACEHOLDER_LISTS.sub("?, ...", statement)
+
+    return _REPEATED_ROWS.sub(r"\1, ...", statement)
+
+def instrument_engine(engine):
+    """
+    Attribute every statement run on the engine to the current request's
+    QueryStats. Statements outside a request cost one context lookup.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_query_stats.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_query_stats.get()
+
+        if stats is None or not conn.info.get("query_started"):
+            return
+
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        rows = cursor.rowcount
+
+        if rows < 0:
+            # The asyncpg adapter buffers SELECT results and reports no rowcount
+            rows = len(getattr(cursor, "_rows", None) or ())
+
+        stats.record(statement, duration, rows)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from app.database import connect_unpooled
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to restore a lost LISTEN connection, doubling
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+class ChannelListener:
+    """
+    In-memory state maintained from a PostgreSQL NOTIFY channel, on a
+    dedicated LISTEN connection to the primary opened outside the pool, so
+    it takes no pool slot.
+
+    On connecting, subclasses load their state with ``load``; notifications
+    arriving meanwhile are buffered and handed to ``install`` with it, so
+    none falls between the two. A lost connection is reestablished with
+    backoff and the state loaded again, since notifications were missed.
+    """
+
+    channel: str
+
+    def __init__(self):
+        self.running = False
+        self._connection = None
+        # Notifications received while ``load`` is in flight
+        self._pending: Optional[List[str]] = None
+        self._stopped = False
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    async def load(self):
+        raise NotImplementedError
+
+    def install(self, state, pending: List[str]):
+        raise NotImplementedError
+
+    def receive(self, payload: str):
+        raise NotImplementedError
+
+    def disconnected(self):
+        """
+        Called when the connection is lost, before reconnecting
+        """
+
+    async def start(self, engine, session_factory):
+        self._engine = engine
+        self._session_factory = session_factory
+        self._stopped = False
+        await self._connect()
+
+    async def stop(self):
+        self._stopped = True
+        self.running = False
+
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _connect(self):
+        # Listen before loading, so no notification falls between the two
+        self._pending = []
+        connection = await connect_unpooled(self._engine)
+
+        try:
+            await connection.add_listener(self.channel, self._on_notify)
+            # A connection lost from here on, even mid-load, is reconnected
+            connection.add_termination_listener(self._on_terminate)
+            state = await self.load()
+        except BaseException:
+            self._pending = None
+            await connection.close()
+            raise
+
+        self._connection = connection
+        pending, self._pending = self._pending, None
+        self.install(state, pending)
+        self.running = not connection.is_closed()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        if self._pending is not None:
+            self._pending.append(payload)
+        else:
+            self.receive(payload)
+
+    def _on_terminate(self, connection):
+        if self._stopped:
+            return
+
+        logger.warning("Connection listening on %s closed, reconnecting", self.channel)
+        self.running = False
+        self.disconnected()
+
+        if self._reconnect_task is None:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = RECONNECT_MIN_DELAY
+
+        try:
+            while not self._stopped:
+                await asyncio.sleep(delay)
+
+                if self._connection is not None:
+                    connection, self._connection = self._connection, None
+                    connection.terminate()
+
+                try:
+                    await self._connect()
+                except Exception:
+                    logger.warning("Listening on %s again failed, retrying in %.0fs", self.channel, delay, exc_info=True)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+
+                # Lost again during the load: try once more
+                if self.running:
+                    logger.info("Listening on %s again", self.channel)
+                    return
+        finally:
+            self._reconnect_task = None
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Integer, String, Text, cast, column, func, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.listener import ChannelListener
+from app.models.inventory import Inventory
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY channel carrying low-stock transitions
+CHANNEL = "low_stock"
+
+# Events buffered per subscriber before a slow one is disconnected
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# (product id, quantity before, quantity after, threshold after, threshold before)
+Change = Tuple[int, int, int, int, Optional[int]]
+
+def transition(old_quantity: int, new_quantity: int, threshold: int, old_threshold: Optional[int] = None) -> Optional[str]:
+    """
+    ``enter``/``leave`` when a row crosses its threshold, ``update`` when a
+    low row changes, None otherwise. A new row has no old quantity.
+    """
+    if old_threshold is None:
+        old_threshold = threshold
+
+    was_low = old_quantity is not None and old_quantity < old_threshold
+    is_low = new_quantity < threshold
+
+    if is_low and not was_low:
+        return "enter"
+
+    if was_low and not is_low:
+        return "leave"
+
+    if is_low and (old_quantity, old_threshold) != (new_quantity, threshold):
+        return "update"
+
+    return None
+
+async def notify_changes(db: AsyncSession, changes: Iterable[Change]):
+    """
+    Queue a NOTIFY for every change that affects the low-stock set. Notifications
+    are delivered when the transaction commits and dropped if it rolls back, so
+    listeners only ever see committed quantities. Costs one statement, and only
+    when some row enters, leaves or is already low.
+    """
+    events = []
+
+    for product_id, old_quantity, new_quantity, threshold, old_threshold in changes:
+        event = transition(old_quantity, new_quantity, threshold, old_threshold)
+
+        if event:
+            events.append((event, product_id, new_quantity, threshold))
+
+    if not events:
+        return
+
+    transitions = values(
+        column("event", String),
+        column("product_id", Integer),
+        column("quantity", Integer),
+        column("threshold", Integer),
+        name="transitions"
+    ).data(events)
+
+    payload = func.json_build_object(
+        "event", transitions.c.event,
+        "product_id", Product.id,
+        "product_name", Product.name,
+        "product_sku", Product.sku,
+        "current_quantity", transitions.c.quantity,
+        "low_stock_threshold", transitions.c.threshold
+    )
+
+    await db.execute(
+        select(func.pg_notify(CHANNEL, cast(payload, Text))).select_from(
+            transitions.join(Product, Product.id == transitions.c.product_id)
+        )
+    )
+
+class LowStockMonitor(ChannelListener):
+    """
+    The set of products below their low-stock threshold, kept in memory.
+
+    Loaded with one scan on startup and then maintained from the NOTIFY
+    transitions that writes emit, so every worker process sees every write.
+    Subscribers receive the transitions as they arrive. While the listener
+    is reconnecting the set goes stale; readers fall back to scanning.
+    """
+
+    channel = CHANNEL
+
+    def __init__(self):
+        super().__init__()
+        self.alerts: Dict[int, dict] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    async def load(self) -> list:
+        async with self._session_factory() as db:
+            return await scan_low_stock(db)
+
+    def install(self, alerts: list, pending: List[str]):
+        # Transitions that arrived during the scan apply on top of its result
+        self.alerts = {alert["product_id"]: alert for alert in alerts}
+
+        for payload in pending:
+            self.receive(payload)
+
+    def receive(self, payload: str):
+        try:
+            self.apply(json.loads(payload))
+        except (ValueError, KeyError):
+            logger.warning("Ignoring malformed low-stock notification: %s", payload)
+
+    def disconnected(self):
+        self._end_subscribers()
+
+    async def stop(self):
+        await super().stop()
+        self._end_subscribers()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def snapshot(self) -> list:
+        return sorted(self.alerts.values(), key=lambda alert: alert["product_id"])
+
+    def apply(self, event: dict):
+        alert = {key: value for key, value in event.items() if key != "event"}
+
+        if event["event"] == "leave":
+            self.alerts.pop(alert["product_id"], None)
+        else:
+            self.alerts[alert["product_id"]] = alert
+
+        for queue in list(self._subscribers):
+            if not _offer(queue, event):
+                # Too far behind: end its stream, it resyncs from a new snapshot
+                self._subscribers.discard(queue)
+                _offer(queue, None, force=True)
+
+    def _end_subscribers(self):
+        for queue in self._subscribers:
+            _offer(queue, None, force=True)
+
+        self._subscribers.clear()
+
+async def scan_low_stock(db: AsyncSession) -> list:
+    query = select(
+        Inventory.product_id,
+        Product.name.label("product_name"),
+        Product.sku.label("product_sku"),
+        Inventory.quantity.label("current_quantity"),
+        Inventory.low_stock_threshold
+    ).join(Product).filter(
+        Inventory.quantity < Inventory.low_stock_threshold
+    )
+
+    result = await db.execute(query)
+
+    return [dict(row._mapping) for row in result]
+
+def _offer(queue: asyncio.Queue, item, force: bool = False) -> bool:
+    try:
+        queue.put_nowait(item)
+        return True
+    except asyncio.QueueFull:
+        if force:
+            # Make room for the end-of-stream marker
+            queue.get_nowait()
+            queue.put_nowait(item)
+        return False
+
+low_stock_monitor = LowStockMonitor()
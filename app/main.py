@@ -1,9 +1,23 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.config import settings
+from app.database import pool_metrics, engine, async_session
+from app.health import readiness
+from app.low_stock import low_stock_monitor
+from app.metrics import CONTENT_TYPE, registry, render_metrics
+from app.middleware import MetricsMiddleware, QueryStatsMiddleware, ReadYourWritesMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
 from app.routers import products, categories, sales, inventory, analytics
+from app.routers.analytics import APPROX_ERROR_HEADER
+from app.sketch_feed import sketch_feed
+from app.sketches import product_sketches, sale_day
 
 app = FastAPI(
     title="E-commerce Admin API",
@@ -18,8 +32,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", APPROX_ERROR_HEADER],
 )
 
+# Keep clients on the primary briefly after their own writes
+if settings.read_your_writes_seconds:
+    app.add_middleware(ReadYourWritesMiddleware, window=settings.read_your_writes_seconds)
+
+# Outer layers, so the statements and time of every other middleware count too
+if settings.query_stats_enabled:
+    app.add_middleware(QueryStatsMiddleware, threshold=settings.query_log_threshold)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(categories.router, prefix="/api/categories", tags=["Categories"])
@@ -27,6 +53,84 @@ app.include_router(sales.router, prefix="/api/sales", tags=["Sales"])
 app.include_router(inventory.router, prefix="/api/inventory", tags=["Inventory"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 
+logger = logging.getLogger(__name__)
+background_tasks = set()
+
+@app.on_event("startup")
+async def start_sketch_feed():
+    """
+    Restore the product sketches from SKETCH_PATH, then keep them current
+    from the sales of every worker. They are rebuilt from the database in
+    the background first: entirely without a file, otherwise the days
+    since it was saved, whose later sales it lacks.
+    """
+    start_day = None
+
+    if settings.sketch_path and os.path.exists(settings.sketch_path):
+        saved_at = product_sketches.load(settings.sketch_path)
+
+        if saved_at is not None:
+            # A day earlier for sales that started before the save and committed after
+            start_day = sale_day(saved_at) - timedelta(days=1)
+
+    task = asyncio.create_task(run_sketch_feed(start_day))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def run_sketch_feed(start_day):
+    try:
+        await sketch_feed.start(engine, async_session, start_day=start_day)
+    except Exception:
+        logger.exception("Sketch feed unavailable, product sketches are not kept current")
+
+@app.on_event("startup")
+async def start_low_stock_monitor():
+    try:
+        await low_stock_monitor.start(engine, async_session)
+    except Exception:
+        logger.exception("Low-stock monitor unavailable, alerts fall back to scanning")
+
+@app.on_event("shutdown")
+async def stop_low_stock_monitor():
+    await low_stock_monitor.stop()
+
+@app.on_event("shutdown")
+async def save_sketches():
+    await sketch_feed.stop()
+
+    # Sketches never loaded would overwrite a good file with empty ones
+    if settings.sketch_path and sketch_feed.loaded:
+        if not product_sketches.save(settings.sketch_path):
+            logger.info("Another worker is saving the product sketches")
+
+metrics_flusher = None
+
+@app.on_event("startup")
+async def start_metrics_flusher():
+    """
+    In multiprocess mode, publish this worker's metrics for the others'
+    /metrics responses
+    """
+    global metrics_flusher
+
+    if settings.metrics_enabled and settings.metrics_multiprocess_dir:
+        metrics_flusher = asyncio.create_task(flush_metrics())
+
+async def flush_metrics():
+    while True:
+        await asyncio.sleep(settings.metrics_flush_interval)
+
+        try:
+            registry.write_snapshot(settings.metrics_multiprocess_dir)
+        except OSError:
+            logger.exception("Writing the metrics snapshot failed")
+
+@app.on_event("shutdown")
+async def stop_metrics_flusher():
+    if metrics_flusher is not None:
+        metrics_flusher.cancel()
+        registry.write_snapshot(settings.metrics_multiprocess_dir, final=True)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to E-commerce Admin API"}
@@ -35,6 +139,35 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/live")
+async def liveness():
+    """
+    The process is serving requests; touches nothing else
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Whether to route traffic here: a pooled connection and a round trip on
+    every engine within HEALTH_CHECK_TIMEOUT, and pool waits below
+    HEALTH_POOL_WAIT_THRESHOLD. Not ready answers 503.
+    """
+    report = await readiness()
+
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
+@app.get("/health/pool")
+async def pool_status():
+    return pool_metrics()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
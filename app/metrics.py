@@ -0,0 +1,342 @@
+import glob
+import json
+import math
+import os
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.cache import analytics_cache
+from app.config import settings
+from app.database import pool_metrics
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Metric:
+    """
+    A metric family: one value per combination of label values.
+
+    Updates are plain dict and float operations without locks. Every update
+    happens on the worker's event loop thread, so none can interleave.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[tuple, object] = {}
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": [[list(labels), value] for labels, value in self.values.items()]
+        }
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels):
+        # For monotonic totals maintained elsewhere (pool checkouts, cache hits)
+        self.values[labels] = value
+
+class Gauge(Metric):
+    """
+    ``mode`` decides how workers combine in multiprocess mode: ``sum`` adds
+    their values, ``all`` keeps one series per worker under a ``pid`` label.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), mode: str = "all"):
+        super().__init__(name, documentation, labelnames)
+        self.mode = mode
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "mode": self.mode}
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram. Each series is a list of per-bucket counts
+    (the last one is +Inf) followed by the sum and the count.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        series = self.values.get(labels)
+
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 3)
+
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+class MetricsRegistry:
+    """
+    The metrics of this worker process.
+
+    ``collectors`` refresh the metrics read from elsewhere (pool, cache)
+    right before a snapshot. In multiprocess mode every worker periodically
+    writes its snapshot to a shared directory and /metrics merges them all.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def snapshot(self, include_gauges: bool = True) -> dict:
+        for collect in self.collectors:
+            collect()
+
+        return {
+            name: metric.snapshot()
+            for name, metric in self.metrics.items()
+            if include_gauges or metric.type != "gauge"
+        }
+
+    def write_snapshot(self, directory: str, final: bool = False):
+        """
+        Publish this worker's metrics. The final snapshot of a stopping
+        worker leaves out its gauges, which stop being meaningful.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+
+        with open(path + ".tmp", "w") as f:
+            json.dump({"pid": os.getpid(), "metrics": self.snapshot(include_gauges=not final)}, f)
+
+        os.replace(path + ".tmp", path)
+
+    def render(self, directory: Optional[str] = None) -> str:
+        """
+        Prometheus text exposition of this worker, or of all the workers
+        that wrote a snapshot to ``directory``
+        """
+        if not directory:
+            return render_families(self.snapshot())
+
+        self.write_snapshot(directory)
+
+        return render_families(merge_snapshots(read_snapshots(directory)))
+
+def read_snapshots(directory: str) -> List[dict]:
+    snapshots = []
+
+    for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Being replaced or removed by its worker
+            continue
+
+    return snapshots
+
+def merge_snapshots(snapshots: List[dict]) -> dict:
+    """
+    Sum counters and histograms over all workers, including stopped ones,
+    and combine the gauges of the live workers according to their mode
+    """
+    families = {}
+
+    for snapshot in snapshots:
+        alive = _alive(snapshot["pid"])
+
+        for name, family in snapshot["metrics"].items():
+            if family["type"] == "gauge" and not alive:
+                continue
+
+            merged = families.setdefault(name, {**family, "values": {}})
+
+            if family["type"] == "gauge" and family["mode"] == "all":
+                merged["labelnames"] = family["labelnames"] + ["pid"]
+
+            for labels, value in family["values"]:
+                if family["type"] == "gauge" and family["mode"] == "all":
+                    labels = labels + [str(snapshot["pid"])]
+
+                key = tuple(labels)
+                previous = merged["values"].get(key)
+
+                if previous is None:
+                    merged["values"][key] = value
+                elif family["type"] == "histogram":
+                    merged["values"][key] = [a + b for a, b in zip(previous, value)]
+                else:
+                    merged["values"][key] = previous + value
+
+    for family in families.values():
+        family["values"] = list(family["values"].items())
+
+    return families
+
+def render_families(families: dict) -> str:
+    lines = []
+
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {_escape_help(family['help'])}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        labelnames = family["labelnames"]
+
+        for labels, value in sorted(family["values"], key=lambda item: list(item[0])):
+            pairs = list(zip(labelnames, labels))
+
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                continue
+
+            cumulative = 0
+
+            for bound, count in zip(list(family["buckets"]) + [math.inf], value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(pairs + [('le', _number(bound))])} {_number(cumulative)}")
+
+            lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(pairs)} {_number(value[-1])}")
+
+    return "\n".join(lines) + "\n"
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+registry = MetricsRegistry()
+
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests being served", mode="sum"
+)
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests completed", ["method", "route", "status"]
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is complete", ["method", "route"]
+)
+sales_ingested_total = registry.counter(
+    "sales_ingested_total", "Sales committed, by endpoint", ["source"]
+)
+sale_items_ingested_total = registry.counter(
+    "sale_items_ingested_total", "Sale items committed, by endpoint", ["source"]
+)
+
+db_pool_connections = registry.gauge(
+    "db_pool_connections", "Pooled database connections by state", ["engine", "state"]
+)
+db_pool_size = registry.gauge("db_pool_size", "Configured size of the connection pool", ["engine"])
+db_pool_checkouts_total = registry.counter("db_pool_checkouts_total", "Connection checkouts", ["engine"])
+db_pool_wait_seconds_total = registry.counter(
+    "db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", ["engine"]
+)
+db_pool_wait_seconds_max = registry.gauge(
+    "db_pool_wait_seconds_max", "Longest wait for a pooled connection", ["engine"]
+)
+db_pool_wait_seconds_recent = registry.gauge(
+    "db_pool_wait_seconds_recent", "Moving average of recent waits for a pooled connection", ["engine"]
+)
+
+analytics_cache_lookups_total = registry.counter(
+    "analytics_cache_lookups_total", "Analytics cache lookups by result", ["result"]
+)
+analytics_cache_invalidations_total = registry.counter(
+    "analytics_cache_invalidations_total", "Analytics cache invalidations"
+)
+analytics_cache_entries = registry.gauge("analytics_cache_entries", "Entries in the analytics cache")
+analytics_cache_hit_ratio = registry.gauge(
+    "analytics_cache_hit_ratio", "Share of analytics cache lookups served without a query"
+)
+
+def collect_pool():
+    for name, pool in pool_metrics().items():
+        db_pool_size.set(pool["size"], name)
+        db_pool_connections.set(pool["checked_out"], name, "checked_out")
+        db_pool_connections.set(pool["checked_in"], name, "checked_in")
+        db_pool_connections.set(pool["overflow"], name, "overflow")
+        db_pool_checkouts_total.set(pool["checkouts"], name)
+        db_pool_wait_seconds_total.set(pool["wait_time_total"], name)
+        db_pool_wait_seconds_max.set(pool["wait_time_max"], name)
+        db_pool_wait_seconds_recent.set(pool["wait_time_recent"], name)
+
+def collect_cache():
+    stats = analytics_cache.stats()
+
+    for result in ("hits", "misses", "coalesced"):
+        analytics_cache_lookups_total.set(stats[result], result)
+
+    analytics_cache_invalidations_total.set(stats["invalidations"])
+    if stats["entries"] is not None:
+        analytics_cache_entries.set(stats["entries"])
+
+    analytics_cache_hit_ratio.set(stats["hit_ratio"])
+
+registry.collectors.extend([collect_pool, collect_cache])
+
+def render_metrics() -> str:
+    return registry.render(settings.metrics_multiprocess_dir)
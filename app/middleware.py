@@ -0,0 +1,154 @@
+import logging
+import math
+import time
+
+from app.database import LAST_WRITE_COOKIE, WROTE_STATE
+from app.instrumentation import QueryStats, current_query_stats
+from app.metrics import http_request_duration_seconds, http_requests_in_flight, http_requests_total
+
+logger = logging.getLogger(__name__)
+
+class ReadYourWritesMiddleware:
+    """
+    Stamps the response of every successful write with a cookie so that
+    get_read_db keeps the client on the primary for ``window`` seconds.
+    A write is a request that took a get_db session, so read-only POSTs
+    (filters, period comparisons, exports) leave clients on the replica.
+    """
+
+    READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            wrote = scope.get("state", {}).get(WROTE_STATE)
+
+            if message["type"] == "http.response.start" and message["status"] < 400 and wrote:
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={math.ceil(self.window)}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+                }
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+class QueryStatsMiddleware:
+    """
+    Collects the SQL statements each request issues into a QueryStats.
+
+    The totals at the time the response starts go out in a ``Server-Timing``
+    header; the final totals are logged as structured fields once the
+    response is complete. Requests issuing more than ``threshold``
+    statements (when set) are logged as warnings with the statement
+    fingerprints, which is where N+1 patterns show up.
+    """
+
+    def __init__(self, app, threshold: int = 0):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=current_query_stats.get())
+        token = current_query_stats.set(stats)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"server-timing", stats.server_timing().encode())]
+                }
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            self._log(scope, status, stats)
+
+    def _log(self, scope, status, stats: QueryStats):
+        fields = {"method": scope["method"], "path": scope["path"], "status": status, **stats.log_fields()}
+
+        if self.threshold and stats.count > self.threshold:
+            fields["db_fingerprints"] = stats.fingerprints()
+            logger.warning(
+                "%s %s issued %d SQL statements (threshold %d)",
+                scope["method"], scope["path"], stats.count, self.threshold, extra=fields
+            )
+        else:
+            logger.info(
+                "%s %s: %d SQL statements, %.2f ms",
+                scope["method"], scope["path"], stats.count, fields["db_time_ms"], extra=fields
+            )
+
+class MetricsMiddleware:
+    """
+    Records in-flight requests, and latency and status per method and route
+    template, so /api/sales/1 and /api/sales/2 share a series. Requests that
+    match no route are grouped under ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route(scope)
+            http_request_duration_seconds.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests_total.inc(scope["method"], route, str(status))
+            http_requests_in_flight.dec()
+
+    def _route(self, scope) -> str:
+        # The router leaves the matched endpoint in the scope
+        endpoint = scope.get("endpoint")
+
+        if endpoint is None:
+            return "unmatched"
+
+        if endpoint not in self._templates:
+            for route in scope["app"].routes:
+                self._templates.setdefault(getattr(route, "endpoint", None), route.path)
+
+            self._templates.setdefault(endpoint, "unmatched")
+
+        return self._templates[endpoint]
@@ -1,4 +1,7 @@
 from app.models.category import Category
 from app.models.product import Product
 from app.models.inventory import Inventory, InventoryChange
-from app.models.sale import Sale, SaleItem, PaymentMethod
\ No newline at end of file
+from app.models.sale import Sale, SaleItem, PaymentMethod
+from app.models.rollup import (
+    DailyRevenueRollup, DailyCategoryRevenueRollup, DailyProductRevenueRollup
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -18,6 +18,14 @@ class Inventory(Base):
     # Relationships
     product = relationship("Product", back_populates="inventory")
     inventory_changes = relationship("InventoryChange", back_populates="inventory")
+    
+    __table_args__ = (
+        # Low-stock alerts only ever read the few rows below their threshold
+        Index(
+            "ix_inventory_low_stock", "product_id",
+            postgresql_where=quantity < low_stock_threshold
+        ),
+    )
 
 class InventoryChange(Base):
     __tablename__ = "inventory_changes"
@@ -29,4 +37,9 @@ class InventoryChange(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    inventory = relationship("Inventory", back_populates="inventory_changes")
\ No newline at end of file
+    inventory = relationship("Inventory", back_populates="inventory_changes")
+    
+    __table_args__ = (
+        # Change history per inventory row, newest first
+        Index("ix_inventory_changes_inventory_id_created_at", "inventory_id", "created_at", "id"),
+    )
\ No newline at end of file
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, Date, SmallInteger
+
+from app.database import Base
+
+class DailyRevenueRollup(Base):
+    __tablename__ = "daily_revenue_rollup"
+    
+    day = Column(Date, primary_key=True)
+    # Every sale of a day would update the same row; spreading them over
+    # shards keeps concurrent checkouts from queueing on its lock. Readers sum.
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    sale_count = Column(Integer, nullable=False, default=0)
+
+class DailyCategoryRevenueRollup(Base):
+    __tablename__ = "daily_category_revenue_rollup"
+    
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    quantity = Column(Integer, nullable=False, default=0)
+    sale_count = Column(Integer, nullable=False, default=0)
+
+class DailyProductRevenueRollup(Base):
+    __tablename__ = "daily_product_revenue_rollup"
+    
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    quantity = Column(Integer, nullable=False, default=0)
+    sale_count = Column(Integer, nullable=False, default=0)
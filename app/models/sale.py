@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, Text, Enum
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -24,16 +24,22 @@ class Sale(Base):
     customer_name = Column(String(200), nullable=True)
     customer_email = Column(String(200), nullable=True)
     notes = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     items = relationship("SaleItem", back_populates="sale")
+    
+    __table_args__ = (
+        # Time-window scans and (created_at, id) keyset pages; total_amount is
+        # included so revenue aggregations can run as index-only scans
+        Index("ix_sales_created_at_id", "created_at", "id", postgresql_include=["total_amount"]),
+    )
 
 class SaleItem(Base):
     __tablename__ = "sale_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
@@ -42,4 +48,12 @@ class SaleItem(Base):
     
     # Relationships
     sale = relationship("Sale", back_populates="items")
-    product = relationship("Product", back_populates="sale_items")
\ No newline at end of file
+    product = relationship("Product", back_populates="sale_items")
+    
+    __table_args__ = (
+        # Product filters and per-product revenue without touching the heap
+        Index(
+            "ix_sale_items_product_id_sale_id", "product_id", "sale_id",
+            postgresql_include=["quantity", "total"]
+        ),
+    )
\ No newline at end of file
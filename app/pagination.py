@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque token
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match the sort key")
+
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(query, columns: Sequence, limit: int, cursor: Optional[str] = None, skip: int = 0, descending: bool = False):
+    """
+    Order a query by ``columns`` and page it. With a cursor the query seeks
+    directly past the row it points to; otherwise the legacy offset applies.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        position = tuple_(*[literal(value, column.type) for column, value in zip(columns, values)])
+        query = query.filter(key < position if descending else key > position)
+    elif skip:
+        query = query.offset(skip)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+
+    return query.order_by(*order).limit(limit)
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, keys: Sequence[str]):
+    """
+    Expose the cursor of the next page in the X-Next-Cursor header when the
+    page is full; rows may be ORM objects, mappings or dicts.
+    """
+    if not rows or len(rows) < limit:
+        return
+
+    last = rows[-1]
+
+    if isinstance(last, dict):
+        values = [last[key] for key in keys]
+    else:
+        values = [getattr(last, key) for key in keys]
+
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(values)
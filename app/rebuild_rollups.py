@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import sys
+import os
+from datetime import date
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, async_session, Base
+from app.services.rollup_service import RollupService, ROLLUP_TABLES
+
+async def rebuild_rollups(start_date=None, end_date=None):
+    """
+    Create the rollup tables if needed and backfill them from the sales tables
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=ROLLUP_TABLES)
+
+    async with async_session() as session:
+        await RollupService(session).rebuild(start_date, end_date)
+        await session.commit()
+
+    print("Revenue rollups rebuilt successfully!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill or rebuild the daily revenue rollups")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_rollups(args.start, args.end))
@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import sys
+import os
+from datetime import date
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import read_async_session
+from app.services.sketch_service import SketchService
+from app.sketches import product_sketches
+
+async def rebuild_sketches(output: str, start_date=None):
+    """
+    Rebuild the per-day product sketches from the sales tables and save them.
+    Days before ``start_date`` are kept from the existing file.
+    """
+    if os.path.exists(output):
+        product_sketches.load(output)
+
+    async with read_async_session() as session:
+        items = await SketchService(session).rebuild(product_sketches, start_date)
+
+    if not product_sketches.save(output):
+        sys.exit(f"{output} is being saved by another process, try again")
+
+    print(f"Product sketches rebuilt from {items} sale items, {product_sketches.stats()['days']} days saved to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the product sketches behind mode=approx")
+    parser.add_argument("--output", default=settings.sketch_path, required=not settings.sketch_path, help="Sketch file (SKETCH_PATH by default)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="First day to include (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_sketches(args.output, args.start))
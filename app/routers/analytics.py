@@ -1,335 +1,183 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import func, and_, text, extract
-from datetime import datetime, timedelta, date
+from datetime import datetime
+import hashlib
 
-from app.database import get_db
-from app.models.sale import Sale, SaleItem
-from app.models.product import Product
-from app.models.category import Category
+from app.cache import analytics_cache
+from app.database import get_read_db, read_session_factory
 from app.schemas.analytics import (
-    TimeFrame, AnalyticsFilter, ComparisonRequest, RevenuePoint,
-    RevenueData, ComparisonResult, CategoryRevenue, ProductRevenue
+    TimeFrame, AnalyticsMode, RevenueMetric, ComparisonRequest, RevenueData, ComparisonResult, CategoryRevenue, ProductRevenue,
+    DashboardData, CacheStats
 )
+from app.config import settings
+from app.services.analytics_service import AnalyticsService
+from app.services.dashboard_service import DashboardService
 
 router = APIRouter()
 
-@router.get("/revenue", response_model=RevenueData)
-async def get_revenue(
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    time_frame: TimeFrame = TimeFrame.DAILY,
-    db: AsyncSession = Depends(get_db)
-):
-    if not end_date:
-        end_date = datetime.now()
-    
-    if not start_date:
-        if time_frame == TimeFrame.DAILY:
-            start_date = end_date - timedelta(days=30)
-        elif time_frame == TimeFrame.WEEKLY:
-            start_date = end_date - timedelta(weeks=12)
-        elif time_frame == TimeFrame.MONTHLY:
-            start_date = end_date - timedelta(days=365)
-        else:
-            start_date = end_date - timedelta(days=5*365)
+APPROX_ERROR_HEADER = "X-Approx-Error-Bound"
+
+def get_analytics_service(
+    aligned: bool = settings.analytics_aligned_windows,
+    db: AsyncSession = Depends(get_read_db)
+) -> AnalyticsService:
+    return AnalyticsService(db, aligned=aligned)
+
+async def _conditional(request: Request, response: Response, service: AnalyticsService, window, time_frame, compute, tz=None):
+    """
+    In aligned mode, tag the response with an ETag derived from the aligned
+    window and the data version and answer revalidations with 304. Nothing
+    in the response is client specific, so shared caches may store it too.
+    """
+    if not service.aligned:
+        return await compute()
+    
+    params = sorted(
+        (key, value) for key, value in request.query_params.multi_items()
+        if key not in ("start_date", "end_date")
+    )
+    version = await service.data_version()
+    fingerprint = f"{request.url.path}|{params}|{window[0].isoformat()}|{window[1].isoformat()}|{version}"
+    etag = f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
     
-    if time_frame == TimeFrame.DAILY:
-        date_expr = func.date(Sale.created_at)
-    elif time_frame == TimeFrame.WEEKLY:
-        date_expr = func.date(func.date_trunc('week', Sale.created_at))
-    elif time_frame == TimeFrame.MONTHLY:
-        date_expr = func.date(func.date_trunc('month', Sale.created_at))
-    else:
-        date_expr = func.date(func.date_trunc('year', Sale.created_at))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={service.max_age(time_frame, tz, window[1])}"
+    }
     
-    query = select(
-        date_expr.label("date"),
-        func.sum(Sale.total_amount).label("revenue"),
-        func.count(Sale.id).label("count")
-    ).filter(
-        Sale.created_at.between(start_date, end_date)
-    ).group_by(
-        date_expr
-    ).order_by(
-        date_expr
-    )
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
     
-    result = await db.execute(query)
-    rows = result.fetchall()
+    response.headers.update(headers)
     
-    total_revenue = sum(row.revenue for row in rows)
-    total_count = sum(row.count for row in rows)
-    average_revenue = total_revenue / len(rows) if rows else 0
+    return await compute()
+
+def _approx(response: Response, service: AnalyticsService, window, mode: AnalyticsMode) -> bool:
+    """
+    For mode=approx, report how far any revenue estimate may overshoot
+    """
+    if mode != AnalyticsMode.APPROX:
+        return False
     
-    data = [
-        {
-            "date": row.date,
-            "revenue": float(row.revenue),
-            "count": row.count
-        }
-        for row in rows
-    ]
+    response.headers[APPROX_ERROR_HEADER] = f"{service.approx_error_bound(*window):.2f}"
     
-    return {
-        "data": data,
-        "total_revenue": float(total_revenue),
-        "average_revenue": float(average_revenue),
-        "total_count": total_count
-    }
+    return True
 
-@router.post("/compare-periods", response_model=ComparisonResult)
+@router.get("/revenue", response_model=RevenueData, response_model_exclude_unset=True)
+async def get_revenue(
+    request: Request,
+    response: Response,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    time_frame: TimeFrame = TimeFrame.DAILY,
+    metrics: List[RevenueMetric] = Query([]),
+    tz: Optional[str] = None,
+    fill_gaps: bool = False,
+    service: AnalyticsService = Depends(get_analytics_service)
+):
+    """
+    Revenue per bucket. ``metrics`` adds server-side computed values: 7/30-day
+    moving averages (ma7, ma30, daily only), change against the previous
+    bucket (pop) and the same bucket a year earlier (yoy), and the median and
+    90th percentile order value of the window (median, p90). ``tz`` buckets by
+    the wall clock of an IANA timezone and ``fill_gaps`` returns buckets
+    without sales as zeros.
+    """
+    try:
+        window = service.resolve_window(start_date, end_date, time_frame, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def compute():
+        try:
+            return await service.get_revenue(*window, time_frame, metrics, tz, fill_gaps)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return await _conditional(request, response, service, window, time_frame, compute, tz)
+
+@router.post("/compare-periods", response_model=ComparisonResult, response_model_exclude_unset=True)
 async def compare_periods(
     comparison: ComparisonRequest,
-    db: AsyncSession = Depends(get_db)
+    service: AnalyticsService = Depends(get_analytics_service)
 ):
-    async def get_period_data(start, end, category_id=None, product_id=None):
-        query = select(
-            func.date(Sale.created_at).label("date"),
-            func.sum(Sale.total_amount).label("revenue"),
-            func.count(Sale.id).label("count")
-        ).filter(
-            Sale.created_at.between(start, end)
-        )
-        
-        if category_id or product_id:
-            sale_id_query = select(SaleItem.sale_id).distinct()
-            
-            if product_id:
-                sale_id_query = sale_id_query.filter(SaleItem.product_id == product_id)
-            
-            if category_id:
-                sale_id_query = sale_id_query.join(Product, SaleItem.product_id == Product.id).filter(
-                    Product.category_id == category_id
-                )
-            
-            sale_id_result = await db.execute(sale_id_query)
-            sale_ids = [row[0] for row in sale_id_result]
-            
-            if not sale_ids:
-                return {"data": [], "total_revenue": 0, "average_revenue": 0, "total_count": 0}
-            
-            query = query.filter(Sale.id.in_(sale_ids))
-        
-        query = query.group_by(text("date")).order_by(text("date"))
-        
-        result = await db.execute(query)
-        rows = result.fetchall()
-        
-        total_revenue = sum(row.revenue for row in rows)
-        total_count = sum(row.count for row in rows)
-        average_revenue = total_revenue / len(rows) if rows else 0
-        
-        data = [
-            {
-                "date": row.date,
-                "revenue": float(row.revenue),
-                "count": row.count
-            }
-            for row in rows
-        ]
-        
-        return {
-            "data": data,
-            "total_revenue": float(total_revenue),
-            "average_revenue": float(average_revenue),
-            "total_count": total_count
-        }
-    
-    first_period = await get_period_data(
-        comparison.first_period_start, 
-        comparison.first_period_end,
-        comparison.category_id,
-        comparison.product_id
-    )
-    
-    second_period = await get_period_data(
-        comparison.second_period_start,
-        comparison.second_period_end,
-        comparison.category_id,
-        comparison.product_id
-    )
-    
-    if first_period["total_revenue"] == 0:
-        percentage_change = 100.0 if second_period["total_revenue"] > 0 else 0.0
-    else:
-        percentage_change = (
-            (second_period["total_revenue"] - first_period["total_revenue"]) / 
-            first_period["total_revenue"] * 100
-        )
-    
-    return {
-        "first_period": first_period,
-        "second_period": second_period,
-        "percentage_change": float(percentage_change)
-    }
+    """
+    Compare two or more periods (``periods``, up to 24) in one query, with the
+    percentage change between every pair of periods
+    """
+    return await service.compare_periods(comparison)
 
 @router.get("/category-revenue", response_model=List[CategoryRevenue])
 async def get_category_revenue(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: AsyncSession = Depends(get_db)
+    service: AnalyticsService = Depends(get_analytics_service)
 ):
-    if not end_date:
-        end_date = datetime.now()
+    window = service.resolve_window(start_date, end_date)
     
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-    
-    query = select(
-        Category.id.label("category_id"),
-        Category.name.label("category_name"),
-        func.sum(Sale.total_amount).label("revenue")
-    ).join(
-        SaleItem, Sale.id == SaleItem.sale_id
-    ).join(
-        Product, SaleItem.product_id == Product.id
-    ).join(
-        Category, Product.category_id == Category.id
-    ).filter(
-        Sale.created_at.between(start_date, end_date)
-    ).group_by(
-        Category.id,
-        Category.name
-    ).order_by(
-        text("revenue DESC")
+    return await _conditional(
+        request, response, service, window, None,
+        lambda: service.get_category_revenue(*window)
     )
-    
-    result = await db.execute(query)
-    rows = result.fetchall()
-    
-    total_revenue = sum(row.revenue for row in rows)
-    
-    categories = [
-        {
-            "category_id": row.category_id,
-            "category_name": row.category_name,
-            "revenue": float(row.revenue),
-            "percentage": float(row.revenue / total_revenue * 100) if total_revenue else 0
-        }
-        for row in rows
-    ]
-    
-    return categories
 
 @router.get("/product-revenue", response_model=List[ProductRevenue])
 async def get_product_revenue(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     category_id: Optional[int] = None,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    mode: AnalyticsMode = AnalyticsMode.EXACT,
+    service: AnalyticsService = Depends(get_analytics_service)
 ):
-    if not end_date:
-        end_date = datetime.now()
-    
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    window = service.resolve_window(start_date, end_date)
+    approx = _approx(response, service, window, mode)
     
-    query = select(
-        Product.id.label("product_id"),
-        Product.name.label("product_name"),
-        Product.sku.label("product_sku"),
-        Category.name.label("category_name"),
-        func.sum(SaleItem.total).label("revenue"),
-        func.sum(SaleItem.quantity).label("quantity_sold")
-    ).join(
-        Sale, SaleItem.sale_id == Sale.id
-    ).join(
-        Product, SaleItem.product_id == Product.id
-    ).join(
-        Category, Product.category_id == Category.id
-    ).filter(
-        Sale.created_at.between(start_date, end_date)
+    return await _conditional(
+        request, response, service, window, None,
+        lambda: service.get_product_revenue(*window, category_id, limit, approx)
     )
-    
-    if category_id:
-        query = query.filter(Product.category_id == category_id)
-    
-    query = query.group_by(
-        Product.id,
-        Product.name,
-        Product.sku,
-        Category.name
-    ).order_by(
-        text("revenue DESC")
-    ).limit(limit)
-    
-    result = await db.execute(query)
-    rows = result.fetchall()
-    
-    total_revenue = sum(row.revenue for row in rows)
-    
-    products = [
-        {
-            "product_id": row.product_id,
-            "product_name": row.product_name,
-            "product_sku": row.product_sku,
-            "category_name": row.category_name,
-            "revenue": float(row.revenue),
-            "quantity_sold": row.quantity_sold,
-            "percentage": float(row.revenue / total_revenue * 100) if total_revenue else 0
-        }
-        for row in rows
-    ]
-    
-    return products
 
 @router.get("/low-performing-products", response_model=List[ProductRevenue])
 async def get_low_performing_products(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    mode: AnalyticsMode = AnalyticsMode.EXACT,
+    service: AnalyticsService = Depends(get_analytics_service)
 ):
-    if not end_date:
-        end_date = datetime.now()
-    
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
+    window = service.resolve_window(start_date, end_date)
+    approx = _approx(response, service, window, mode)
     
-    query = select(
-        Product.id.label("product_id"),
-        Product.name.label("product_name"),
-        Product.sku.label("product_sku"),
-        Category.name.label("category_name"),
-        func.sum(SaleItem.total).label("revenue"),
-        func.sum(SaleItem.quantity).label("quantity_sold")
-    ).join(
-        Sale, SaleItem.sale_id == Sale.id
-    ).join(
-        Product, SaleItem.product_id == Product.id
-    ).join(
-        Category, Product.category_id == Category.id
-    ).filter(
-        Sale.created_at.between(start_date, end_date)
-    ).group_by(
-        Product.id,
-        Product.name,
-        Product.sku,
-        Category.name
-    ).order_by(
-        text("revenue ASC")
-    ).limit(limit)
-    
-    result = await db.execute(query)
-    rows = result.fetchall()
-    
-    total_revenue = sum(row.revenue for row in rows)
-    
-    products = [
-        {
-            "product_id": row.product_id,
-            "product_name": row.product_name,
-            "product_sku": row.product_sku,
-            "category_name": row.category_name,
-            "revenue": float(row.revenue),
-            "quantity_sold": row.quantity_sold,
-            "percentage": float(row.revenue / total_revenue * 100) if total_revenue else 0
-        }
-        for row in rows
-    ]
+    return await _conditional(
+        request, response, service, window, None,
+        lambda: service.get_low_performing_products(*window, limit, approx)
+    )
+
+@router.get("/dashboard", response_model=DashboardData, response_model_exclude_unset=True)
+async def get_dashboard(
+    request: Request,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    time_frame: TimeFrame = TimeFrame.DAILY,
+    category_id: Optional[int] = None,
+    limit: int = 10,
+    aligned: bool = settings.analytics_aligned_windows
+):
+    """
+    Revenue, category revenue, product revenue and low performers in one
+    response, queried concurrently on separate connections
+    """
+    service = DashboardService(read_session_factory(request), aligned=aligned)
     
-    return products
\ No newline at end of file
+    return await service.get_dashboard(start_date, end_date, time_frame, category_id, limit)
+
+@router.get("/cache/stats", response_model=CacheStats)
+async def get_cache_stats():
+    return analytics_cache.stats()
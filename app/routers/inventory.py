@@ -1,11 +1,17 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
 from sqlalchemy.sql import func
 from datetime import datetime
+import asyncio
+import json
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.low_stock import low_stock_monitor, notify_changes, scan_low_stock
+from app.pagination import paginate, set_next_cursor
 from app.models.inventory import Inventory, InventoryChange
 from app.models.product import Product
 from app.schemas.inventory import (
@@ -39,6 +45,9 @@ async def create_inventory(
     
     db_inventory = Inventory(**inventory.dict())
     db.add(db_inventory)
+    await notify_changes(db, [
+        (inventory.product_id, None, inventory.quantity, inventory.low_stock_threshold, None)
+    ])
     await db.commit()
     await db.refresh(db_inventory)
     
@@ -46,47 +55,75 @@ async def create_inventory(
 
 @router.get("/", response_model=List[InventoryResponse])
 async def get_all_inventory(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(select(Inventory).offset(skip).limit(limit))
+    result = await db.execute(
+        paginate(select(Inventory), [Inventory.id], limit, cursor=cursor, skip=skip)
+    )
     inventory_items = result.scalars().all()
+    set_next_cursor(response, inventory_items, limit, ["id"])
     return inventory_items
 
 @router.get("/low-stock", response_model=List[LowStockAlert])
 async def get_low_stock_alerts(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = select(
-        Inventory.product_id,
-        Product.name.label("product_name"),
-        Product.sku.label("product_sku"),
-        Inventory.quantity.label("current_quantity"),
-        Inventory.low_stock_threshold
-    ).join(Product).filter(
-        Inventory.quantity < Inventory.low_stock_threshold
-    )
+    # Served from the maintained set; scan only while it is not running
+    if low_stock_monitor.running:
+        return low_stock_monitor.snapshot()
+    
+    return await scan_low_stock(db)
+
+# Seconds between keep-alive comments on idle streams
+STREAM_KEEPALIVE = 15.0
+
+@router.get("/low-stock/stream")
+async def stream_low_stock_alerts(request: Request):
+    """
+    Server-Sent Events: a ``snapshot`` of the low-stock set, then ``enter``,
+    ``update`` and ``leave`` events as writes change it. The stream ends when
+    the client falls too far behind; reconnecting starts from a new snapshot.
+    """
+    if not low_stock_monitor.running:
+        raise HTTPException(status_code=503, detail="Low-stock notifications are not available")
     
-    result = await db.execute(query)
+    queue = low_stock_monitor.subscribe()
     
-    alerts = [
-        {
-            "product_id": row[0],
-            "product_name": row[1],
-            "product_sku": row[2],
-            "current_quantity": row[3],
-            "low_stock_threshold": row[4]
-        }
-        for row in result
-    ]
+    async def events():
+        try:
+            yield _sse_event("snapshot", low_stock_monitor.snapshot())
+            
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                if event is None:
+                    break
+                
+                yield _sse_event(event["event"], event)
+        finally:
+            low_stock_monitor.unsubscribe(queue)
     
-    return alerts
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse_event(name: str, data) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
 
 @router.get("/{inventory_id}", response_model=InventoryResponse)
 async def get_inventory(
     inventory_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     result = await db.execute(select(Inventory).filter(Inventory.id == inventory_id))
     inventory = result.scalars().first()
@@ -99,7 +136,7 @@ async def get_inventory(
 @router.get("/product/{product_id}", response_model=InventoryResponse)
 async def get_inventory_by_product(
     product_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     result = await db.execute(select(Inventory).filter(Inventory.product_id == product_id))
     inventory = result.scalars().first()
@@ -115,13 +152,18 @@ async def update_inventory(
     inventory_update: InventoryUpdate, 
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(Inventory).filter(Inventory.id == inventory_id))
+    # Lock the row so concurrent sale decrements cannot slip between the read
+    # and the write, which would make the notified transition wrong
+    result = await db.execute(
+        select(Inventory).filter(Inventory.id == inventory_id).with_for_update()
+    )
     db_inventory = result.scalars().first()
     
     if not db_inventory:
         raise HTTPException(status_code=404, detail="Inventory not found")
     
     update_data = inventory_update.dict(exclude_unset=True)
+    old_quantity, old_threshold = db_inventory.quantity, db_inventory.low_stock_threshold
     
     if "quantity" in update_data and db_inventory.quantity != update_data["quantity"]:
         quantity_change = update_data["quantity"] - db_inventory.quantity
@@ -138,6 +180,10 @@ async def update_inventory(
     for key, value in update_data.items():
         setattr(db_inventory, key, value)
     
+    await notify_changes(db, [(
+        db_inventory.product_id, old_quantity, db_inventory.quantity,
+        db_inventory.low_stock_threshold, old_threshold
+    )])
     await db.commit()
     await db.refresh(db_inventory)
     
@@ -148,20 +194,31 @@ async def record_inventory_change(
     change: InventoryChangeCreate, 
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(Inventory).filter(Inventory.id == change.inventory_id))
-    inventory = result.scalars().first()
+    # Apply the change atomically; the old quantity follows from the new one,
+    # so the notified transition matches what concurrent writers see
+    values = {"quantity": Inventory.quantity + change.quantity_change}
     
-    if not inventory:
+    if change.quantity_change > 0:
+        values["last_restock_date"] = datetime.now()
+    
+    result = await db.execute(
+        update(Inventory)
+        .where(Inventory.id == change.inventory_id)
+        .values(**values)
+        .returning(Inventory.product_id, Inventory.quantity, Inventory.low_stock_threshold)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    
+    if not row:
         raise HTTPException(status_code=404, detail="Inventory not found")
     
     db_change = InventoryChange(**change.dict())
     db.add(db_change)
     
-    inventory.quantity += change.quantity_change
-    
-    if change.quantity_change > 0:
-        inventory.last_restock_date = datetime.now()
-    
+    await notify_changes(db, [
+        (row.product_id, row.quantity - change.quantity_change, row.quantity, row.low_stock_threshold, None)
+    ])
     await db.commit()
     await db.refresh(db_change)
     
@@ -170,9 +227,11 @@ async def record_inventory_change(
 @router.get("/changes/{inventory_id}", response_model=List[InventoryChangeResponse])
 async def get_inventory_changes(
     inventory_id: int, 
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
     inv_result = await db.execute(select(Inventory).filter(Inventory.id == inventory_id))
     inventory = inv_result.scalars().first()
@@ -181,13 +240,17 @@ async def get_inventory_changes(
         raise HTTPException(status_code=404, detail="Inventory not found")
     
     result = await db.execute(
-        select(InventoryChange)
-        .filter(InventoryChange.inventory_id == inventory_id)
-        .order_by(InventoryChange.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+        paginate(
+            select(InventoryChange).filter(InventoryChange.inventory_id == inventory_id),
+            [InventoryChange.created_at, InventoryChange.id],
+            limit,
+            cursor=cursor,
+            skip=skip,
+            descending=True
+        )
     )
     
     changes = result.scalars().all()
+    set_next_cursor(response, changes, limit, ["created_at", "id"])
     
     return changes
\ No newline at end of file
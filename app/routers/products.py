@@ -1,11 +1,12 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.pagination import paginate, set_next_cursor
 from app.models.product import Product
 from app.models.inventory import Inventory
 from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductWithInventory
@@ -39,10 +40,12 @@ async def create_product(
 
 @router.get("/", response_model=List[ProductResponse])
 async def get_products(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     category_id: int = None,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all products with optional category filter and pagination
@@ -52,18 +55,21 @@ async def get_products(
     if category_id:
         query = query.filter(Product.category_id == category_id)
     
-    query = query.offset(skip).limit(limit)
+    query = paginate(query, [Product.id], limit, cursor=cursor, skip=skip)
     result = await db.execute(query)
     products = result.scalars().all()
+    set_next_cursor(response, products, limit, ["id"])
     
     return products
 
 @router.get("/with-inventory", response_model=List[ProductWithInventory])
 async def get_products_with_inventory(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     category_id: int = None,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all products with their inventory information
@@ -78,7 +84,7 @@ async def get_products_with_inventory(
     if category_id:
         query = query.filter(Product.category_id == category_id)
     
-    query = query.offset(skip).limit(limit)
+    query = paginate(query, [Product.id], limit, cursor=cursor, skip=skip)
     result = await db.execute(query)
     
     products = [
@@ -98,13 +104,14 @@ async def get_products_with_inventory(
         }
         for row in result
     ]
+    set_next_cursor(response, products, limit, ["id"])
     
     return products
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific product by ID
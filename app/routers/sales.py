@@ -1,16 +1,22 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, between
 from datetime import datetime, timedelta
-import uuid
+import json
 
-from app.database import get_db
-from app.models.sale import Sale, SaleItem
-from app.models.product import Product
-from app.models.inventory import Inventory, InventoryChange
-from app.schemas.sale import SaleCreate, SaleResponse, SaleFilter
+from app.database import get_db, get_read_db, read_session_factory
+from app.pagination import paginate, set_next_cursor
+from app.models.sale import Sale
+from app.config import settings
+from app.schemas.sale import (
+    SaleCreate, SaleResponse, SaleFilter, BulkSaleResponse, ExportFormat, ParquetExportResult
+)
+from app.services.export_service import ExportService
+from app.services.parquet_export_service import ExportInProgress, ParquetExportService
+from app.services.sale_service import SaleService
 
 router = APIRouter()
 
@@ -19,76 +25,69 @@ async def create_sale(
     sale: SaleCreate, 
     db: AsyncSession = Depends(get_db)
 ):
-    reference_number = f"SALE-{uuid.uuid4().hex[:8].upper()}"
-    
-    db_sale = Sale(
-        reference_number=reference_number,
-        total_amount=sale.total_amount,
-        tax_amount=sale.tax_amount,
-        discount_amount=sale.discount_amount,
-        payment_method=sale.payment_method,
-        customer_name=sale.customer_name,
-        customer_email=sale.customer_email,
-        notes=sale.notes
-    )
-    
-    db.add(db_sale)
-    await db.commit()
-    await db.refresh(db_sale)
+    return await SaleService(db).create_sale(sale)
+
+@router.post("/bulk", response_model=BulkSaleResponse)
+async def bulk_create_sales(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ingest a batch of sales sent as a JSON array or as NDJSON
+    (Content-Type: application/x-ndjson), one SaleCreate payload per row
+    """
+    content_type = request.headers.get("content-type", "")
+    
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        payloads = _ndjson_payloads(request)
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of sales")
+        
+        payloads = _list_payloads(body)
+    
+    return await SaleService(db).bulk_create_sales(payloads)
+
+async def _list_payloads(body: list):
+    for payload in body:
+        yield payload
+
+async def _ndjson_payloads(request: Request):
+    buffer = b""
     
-    for item in sale.items:
-        db_sale_item = SaleItem(
-            sale_id=db_sale.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price,
-            discount=item.discount,
-            total=item.total
-        )
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
         
-        db.add(db_sale_item)
-        
-        result = await db.execute(
-            select(Inventory).filter(Inventory.product_id == item.product_id)
-        )
-        inventory = result.scalars().first()
-        
-        if inventory:
-            db_change = InventoryChange(
-                inventory_id=inventory.id,
-                quantity_change=-item.quantity,
-                reason=f"Sale: {reference_number}"
-            )
-            db.add(db_change)
-            
-            inventory.quantity -= item.quantity
-    
-    await db.commit()
-    
-    result = await db.execute(
-        select(Sale)
-        .filter(Sale.id == db_sale.id)
-    )
-    
-    created_sale = result.scalars().first()
+        for line in lines:
+            if line.strip():
+                yield _parse_ndjson_line(line)
     
-    for item in created_sale.items:
-        result = await db.execute(select(Product).filter(Product.id == item.product_id))
-        product = result.scalars().first()
-        if product:
-            setattr(item, "product_name", product.name)
-    
-    return created_sale
+    if buffer.strip():
+        yield _parse_ndjson_line(buffer)
+
+def _parse_ndjson_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
 
 @router.get("/", response_model=List[SaleResponse])
 async def get_sales(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     product_id: Optional[int] = None,
     category_id: Optional[int] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     query = select(Sale)
     
@@ -104,185 +103,100 @@ async def get_sales(
         query = query.filter(and_(*filters))
     
     if product_id or category_id:
-        sale_id_query = select(SaleItem.sale_id).distinct()
-        
-        if product_id:
-            sale_id_query = sale_id_query.filter(SaleItem.product_id == product_id)
-        
-        if category_id:
-            sale_id_query = sale_id_query.join(Product, SaleItem.product_id == Product.id).filter(
-                Product.category_id == category_id
-            )
-        
-        sale_id_result = await db.execute(sale_id_query)
-        sale_ids = [row[0] for row in sale_id_result]
-        
-        if not sale_ids:
-            return []
-        
-        query = query.filter(Sale.id.in_(sale_ids))
+        query = query.filter(SaleService.item_filter(product_id, category_id))
     
-    query = query.order_by(Sale.created_at.desc()).offset(skip).limit(limit)
-    
-    result = await db.execute(query)
-    sales = result.scalars().all()
+    query = paginate(
+        query, [Sale.created_at, Sale.id], limit, cursor=cursor, skip=skip, descending=True
+    )
     
-    processed_sales = []
+    sales = await SaleService(db).load_sales(query)
+    set_next_cursor(response, sales, limit, ["created_at", "id"])
     
-    for sale in sales:
-        sale_dict = {
-            "id": sale.id,
-            "reference_number": sale.reference_number,
-            "total_amount": sale.total_amount,
-            "tax_amount": sale.tax_amount,
-            "discount_amount": sale.discount_amount,
-            "payment_method": sale.payment_method,
-            "customer_name": sale.customer_name,
-            "customer_email": sale.customer_email,
-            "notes": sale.notes,
-            "created_at": sale.created_at,
-            "items": []
-        }
-        
-        items_result = await db.execute(
-            select(SaleItem).filter(SaleItem.sale_id == sale.id)
-        )
-        sale_items = items_result.scalars().all()
-        
-        for item in sale_items:
-            item_dict = {
-                "id": item.id,
-                "sale_id": item.sale_id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "price": item.price,
-                "discount": item.discount,
-                "total": item.total
-            }
+    return sales
+
+@router.get("/export")
+async def export_sales(
+    request: Request,
+    format: ExportFormat = ExportFormat.CSV,
+    filter_params: SaleFilter = Depends()
+):
+    """
+    Stream every sale matching the filters, with its items and product names,
+    as CSV (one line per item) or NDJSON (one sale per line)
+    """
+    session_factory = read_session_factory(request)
+    
+    async def body():
+        # The session lives as long as the stream, not the request handler
+        async with session_factory() as db:
+            service = ExportService(db)
             
-            product_result = await db.execute(select(Product).filter(Product.id == item.product_id))
-            product = product_result.scalars().first()
-            if product:
-                item_dict["product_name"] = product.name
+            if format == ExportFormat.CSV:
+                chunks = service.stream_csv(filter_params)
+            else:
+                chunks = service.stream_ndjson(filter_params)
             
-            sale_dict["items"].append(item_dict)
-        
-        processed_sales.append(sale_dict)
+            async for chunk in chunks:
+                yield chunk
     
-    return processed_sales
+    media_type = "text/csv" if format == ExportFormat.CSV else "application/x-ndjson"
+    filename = f"sales-{datetime.now():%Y%m%d%H%M%S}.{format.value}"
+    
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/export/parquet", response_model=ParquetExportResult)
+async def export_sales_parquet(
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Export the sales added since the last run to month-partitioned Parquet
+    files under EXPORT_DIR. Reads the primary: on a lagging replica the
+    watermark could pass sales not replicated yet.
+    """
+    try:
+        return await ParquetExportService(db).export(settings.export_dir)
+    except ExportInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
 
 @router.get("/{sale_id}", response_model=SaleResponse)
 async def get_sale(
     sale_id: int, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(select(Sale).filter(Sale.id == sale_id))
-    sale = result.scalars().first()
+    sale = await SaleService(db).get_sale(sale_id)
     
     if not sale:
         raise HTTPException(status_code=404, detail="Sale not found")
     
-    sale_dict = {
-        "id": sale.id,
-        "reference_number": sale.reference_number,
-        "total_amount": sale.total_amount,
-        "tax_amount": sale.tax_amount,
-        "discount_amount": sale.discount_amount,
-        "payment_method": sale.payment_method,
-        "customer_name": sale.customer_name,
-        "customer_email": sale.customer_email,
-        "notes": sale.notes,
-        "created_at": sale.created_at,
-        "items": []
-    }
-    
-    items_result = await db.execute(
-        select(SaleItem).filter(SaleItem.sale_id == sale.id)
-    )
-    sale_items = items_result.scalars().all()
-    
-    for item in sale_items:
-        item_dict = {
-            "id": item.id,
-            "sale_id": item.sale_id,
-            "product_id": item.product_id,
-            "quantity": item.quantity,
-            "price": item.price,
-            "discount": item.discount,
-            "total": item.total
-        }
-        
-        product_result = await db.execute(select(Product).filter(Product.id == item.product_id))
-        product = product_result.scalars().first()
-        if product:
-            item_dict["product_name"] = product.name
-        
-        sale_dict["items"].append(item_dict)
-    
-    return sale_dict
+    return sale
 
 @router.post("/filter", response_model=List[SaleResponse])
 async def filter_sales(
     filter_params: SaleFilter,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
     query = select(Sale)
     
-    filters = []
-    
-    if filter_params.start_date:
-        filters.append(Sale.created_at >= filter_params.start_date)
+    conditions = SaleService.sale_filters(filter_params)
     
-    if filter_params.end_date:
-        filters.append(Sale.created_at <= filter_params.end_date)
+    if conditions is not None:
+        query = query.filter(conditions)
     
-    if filter_params.min_amount is not None:
-        filters.append(Sale.total_amount >= filter_params.min_amount)
-    
-    if filter_params.max_amount is not None:
-        filters.append(Sale.total_amount <= filter_params.max_amount)
-    
-    if filters:
-        query = query.filter(and_(*filters))
-    
-    if filter_params.product_id or filter_params.category_id:
-        sale_id_query = select(SaleItem.sale_id).distinct()
-        
-        if filter_params.product_id:
-            sale_id_query = sale_id_query.filter(SaleItem.product_id == filter_params.product_id)
-        
-        if filter_params.category_id:
-            sale_id_query = sale_id_query.join(Product, SaleItem.product_id == Product.id).filter(
-                Product.category_id == filter_params.category_id
-            )
-        
-        sale_id_result = await db.execute(sale_id_query)
-        sale_ids = [row[0] for row in sale_id_result]
-        
-        if not sale_ids:
-            return []
-        
-        query = query.filter(Sale.id.in_(sale_ids))
-    
-    query = query.order_by(Sale.created_at.desc()).offset(skip).limit(limit)
-    
-    result = await db.execute(query)
-    sales = result.scalars().all()
+    query = paginate(
+        query, [Sale.created_at, Sale.id], limit, cursor=cursor, skip=skip, descending=True
+    )
     
-    for sale in sales:
-        items_result = await db.execute(
-            select(SaleItem).filter(SaleItem.sale_id == sale.id)
-        )
-        sale_items = items_result.scalars().all()
-        
-        for item in sale_items:
-            product_result = await db.execute(select(Product).filter(Product.id == item.product_id))
-            product = product_result.scalars().first()
-            if product:
-                setattr(item, "product_name", product.name)
-        
-        sale.items = sale_items
+    sales = await SaleService(db).load_sales(query)
+    set_next_cursor(response, sales, limit, ["created_at", "id"])
     
-    return sales
\ No newline at end of file
+    return sales
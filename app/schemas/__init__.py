@@ -5,9 +5,11 @@ from app.schemas.inventory import (
     InventoryChangeCreate, InventoryChangeResponse, LowStockAlert
 )
 from app.schemas.sale import (
-    SaleCreate, SaleResponse, SaleItemCreate, SaleItemResponse, SaleFilter
+    SaleCreate, SaleResponse, SaleItemCreate, SaleItemResponse, SaleFilter,
+    ExportFormat, ParquetExportResult, BulkSaleResult, BulkSaleResponse
 )
 from app.schemas.analytics import (
-    TimeFrame, AnalyticsFilter, ComparisonRequest, RevenuePoint,
-    RevenueData, ComparisonResult, CategoryRevenue, ProductRevenue
+    TimeFrame, AnalyticsMode, RevenueMetric, AnalyticsFilter, Period, ComparisonRequest, RevenuePoint,
+    RevenueData, PeriodRevenue, PeriodChange, ComparisonResult, CategoryRevenue, ProductRevenue,
+    DashboardData, CacheStats
 )
\ No newline at end of file
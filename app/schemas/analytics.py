@@ -1,6 +1,6 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, date
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 from enum import Enum
 
 class TimeFrame(str, Enum):
@@ -9,6 +9,18 @@ class TimeFrame(str, Enum):
     MONTHLY = "monthly"
     YEARLY = "yearly"
 
+class AnalyticsMode(str, Enum):
+    EXACT = "exact"
+    APPROX = "approx"
+
+class RevenueMetric(str, Enum):
+    MOVING_AVERAGE_7 = "ma7"
+    MOVING_AVERAGE_30 = "ma30"
+    PERIOD_OVER_PERIOD = "pop"
+    YEAR_OVER_YEAR = "yoy"
+    MEDIAN_ORDER_VALUE = "median"
+    P90_ORDER_VALUE = "p90"
+
 class AnalyticsFilter(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
@@ -16,29 +28,84 @@ class AnalyticsFilter(BaseModel):
     category_id: Optional[int] = None
     time_frame: TimeFrame = TimeFrame.DAILY
 
+# Upper bound on the periods of one comparison
+MAX_COMPARISON_PERIODS = 24
+
+class Period(BaseModel):
+    start_date: datetime
+    end_date: datetime
+
 class ComparisonRequest(BaseModel):
-    first_period_start: datetime
-    first_period_end: datetime
-    second_period_start: datetime
-    second_period_end: datetime
+    """
+    Either two periods through the first_/second_period fields or a list of
+    ``periods``; when both are given the list wins.
+    """
+    first_period_start: Optional[datetime] = None
+    first_period_end: Optional[datetime] = None
+    second_period_start: Optional[datetime] = None
+    second_period_end: Optional[datetime] = None
+    periods: Optional[List[Period]] = None
     category_id: Optional[int] = None
     product_id: Optional[int] = None
+    
+    @root_validator(skip_on_failure=True)
+    def check_periods(cls, values):
+        periods = values.get("periods")
+        
+        if periods is not None:
+            if not 2 <= len(periods) <= MAX_COMPARISON_PERIODS:
+                raise ValueError(f"Between 2 and {MAX_COMPARISON_PERIODS} periods can be compared")
+        elif not all(values.get(field) for field in (
+            "first_period_start", "first_period_end", "second_period_start", "second_period_end"
+        )):
+            raise ValueError("Provide periods or all of the first_period_* and second_period_* fields")
+        
+        return values
+    
+    def period_ranges(self) -> List[Tuple[datetime, datetime]]:
+        if self.periods is not None:
+            return [(period.start_date, period.end_date) for period in self.periods]
+        
+        return [
+            (self.first_period_start, self.first_period_end),
+            (self.second_period_start, self.second_period_end)
+        ]
 
 class RevenuePoint(BaseModel):
     date: date
     revenue: float
     count: int
+    # Requested metrics only; changes are percentages
+    moving_average_7: Optional[float] = None
+    moving_average_30: Optional[float] = None
+    period_change: Optional[float] = None
+    yoy_change: Optional[float] = None
 
 class RevenueData(BaseModel):
     data: List[RevenuePoint]
     total_revenue: float
     average_revenue: float
     total_count: int
+    median_order_value: Optional[float] = None
+    p90_order_value: Optional[float] = None
+
+class PeriodRevenue(RevenueData):
+    start_date: datetime
+    end_date: datetime
+
+class PeriodChange(BaseModel):
+    from_period: int
+    to_period: int
+    percentage_change: float
 
 class ComparisonResult(BaseModel):
+    # The first two periods, as before multi-period comparisons
     first_period: RevenueData
     second_period: RevenueData
     percentage_change: float
+    periods: List[PeriodRevenue] = []
+    # Every pair of periods, earlier index first
+    changes: List[PeriodChange] = []
 
 class CategoryRevenue(BaseModel):
     category_id: int
@@ -53,4 +120,20 @@ class ProductRevenue(BaseModel):
     category_name: str
     revenue: float
     quantity_sold: int
-    percentage: float
\ No newline at end of file
+    percentage: float
+
+class DashboardData(BaseModel):
+    revenue: Optional[RevenueData] = None
+    category_revenue: Optional[List[CategoryRevenue]] = None
+    product_revenue: Optional[List[ProductRevenue]] = None
+    low_performing_products: Optional[List[ProductRevenue]] = None
+    # Queries that did not finish in time, by field name
+    errors: Dict[str, str] = {}
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    coalesced: int
+    invalidations: int
+    entries: Optional[int] = None
+    hit_ratio: float
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel, Field
 from app.models.sale import PaymentMethod
 
@@ -48,4 +49,25 @@ class SaleFilter(BaseModel):
     product_id: Optional[int] = None
     category_id: Optional[int] = None
     min_amount: Optional[float] = None
-    max_amount: Optional[float] = None
\ No newline at end of file
+    max_amount: Optional[float] = None
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class ParquetExportResult(BaseModel):
+    rows: int
+    files: List[str]
+    watermark: Optional[datetime] = None
+
+class BulkSaleResult(BaseModel):
+    index: int
+    status: str
+    sale_id: Optional[int] = None
+    reference_number: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkSaleResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkSaleResult]
@@ -12,11 +12,13 @@ from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 # Add the project root directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.config import settings
 from app.database import ASYNC_DATABASE_URL, Base
 from app.models.category import Category
 from app.models.product import Product
 from app.models.inventory import Inventory, InventoryChange
 from app.models.sale import Sale, SaleItem, PaymentMethod
+from app.services.rollup_service import RollupService
 
 # Categories for Amazon and Walmart products
 CATEGORIES = [
@@ -131,7 +133,7 @@ async def seed_database():
     
     engine = create_async_engine(
         clean_url,
-        echo=True
+        echo=settings.database_echo
     )
     
     # Create all tables
@@ -320,6 +322,10 @@ async def seed_database():
             # Move to the next day
             current_date += timedelta(days=1)
         
+        # Sales were inserted directly, so build the revenue rollups in one pass
+        await RollupService(session).rebuild()
+        await session.commit()
+        
         print("Database seeded successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,545 @@
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import Date, DateTime, Integer, cast, column, func, literal, literal_column, text, values
+
+from app.models.sale import Sale, SaleItem
+from app.models.product import Product
+from app.models.category import Category
+from app.models.rollup import (
+    DailyRevenueRollup, DailyCategoryRevenueRollup, DailyProductRevenueRollup
+)
+from app.cache import AnalyticsCache, analytics_cache
+from app.config import settings
+from app.schemas.analytics import TimeFrame, RevenueMetric
+from app.services.sale_service import SaleService
+
+class AnalyticsBackend:
+    """
+    Query layer behind AnalyticsService.
+
+    Every method returns rows exposing the labelled columns used by the
+    service: ``date``/``revenue``/``count`` for series (plus ``period``, the
+    index of the requested range, for period series),
+    ``category_id``/``category_name``/``revenue`` for categories and
+    ``product_id``/``product_name``/``product_sku``/``category_name``/
+    ``revenue``/``quantity_sold`` for products.
+    """
+    name = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def revenue_series(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        time_frame: TimeFrame,
+        tz: Optional[str] = None,
+        fill_gaps: bool = False
+    ):
+        return await self._fetch(self._series_query(start_date, end_date, time_frame, tz, fill_gaps))
+
+    async def revenue_metrics(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        time_frame: TimeFrame,
+        metrics: List[RevenueMetric],
+        tz: Optional[str] = None,
+        fill_gaps: bool = False
+    ):
+        """
+        Revenue series with the requested metrics computed in one statement.
+
+        The bucket series is built over the window plus the lookback the
+        metrics need, the window functions and the prior-period self-joins run
+        over it, and only the buckets inside the window are returned. Moving
+        averages use a RANGE frame over day numbers, so days without sales count
+        as zero. Order value percentiles cover the sales in the window and are
+        repeated on every row.
+        """
+        lookback_start = _bucket_start(start_date - _lookback(time_frame, metrics), time_frame)
+        series = self._series_query(lookback_start, end_date, time_frame, tz, fill_gaps).cte("series")
+
+        columns = [series.c.date, series.c.revenue, series.c.count]
+        source = series
+
+        day_number = cast(series.c.date, Date) - literal(date(1970, 1, 1), Date)
+
+        for metric, days in ((RevenueMetric.MOVING_AVERAGE_7, 7), (RevenueMetric.MOVING_AVERAGE_30, 30)):
+            if metric in metrics:
+                columns.append((
+                    func.sum(series.c.revenue).over(order_by=day_number, range_=(-(days - 1), 0)) / days
+                ).label(_METRIC_COLUMNS[metric]))
+
+        for metric, steps in (
+            (RevenueMetric.PERIOD_OVER_PERIOD, _PERIOD_STEPS),
+            (RevenueMetric.YEAR_OVER_YEAR, _YEAR_STEPS)
+        ):
+            if metric in metrics:
+                prior = series.alias(f"prior_{metric.value}")
+                source = source.outerjoin(
+                    prior,
+                    prior.c.date == cast(series.c.date - literal_column(f"interval '{steps[time_frame]}'"), Date)
+                )
+                columns.append((
+                    (series.c.revenue - prior.c.revenue) / func.nullif(prior.c.revenue, 0) * 100
+                ).label(_METRIC_COLUMNS[metric]))
+
+        for metric, fraction in ((RevenueMetric.MEDIAN_ORDER_VALUE, 0.5), (RevenueMetric.P90_ORDER_VALUE, 0.9)):
+            if metric in metrics:
+                percentile = select(
+                    func.percentile_cont(fraction).within_group(Sale.total_amount)
+                ).filter(
+                    Sale.created_at.between(start_date, end_date)
+                ).scalar_subquery()
+                columns.append(percentile.label(_METRIC_COLUMNS[metric]))
+
+        # Window functions run before WHERE, so the window is cut in an outer query
+        computed = select(*columns).select_from(source).subquery("computed")
+        window_start = _bucket_start(start_date, time_frame).date()
+
+        query = select(computed).filter(
+            computed.c.date >= window_start
+        ).order_by(
+            computed.c.date
+        )
+
+        return await self._fetch(query)
+
+    def _series_query(self, start_date, end_date, time_frame, tz=None, fill_gaps=False):
+        """
+        Bucket series of the window, densified with generate_series when
+        ``fill_gaps`` is set so buckets without sales appear with zeros.
+        """
+        query = self._revenue_series_query(start_date, end_date, time_frame, tz)
+
+        if not fill_gaps:
+            return query
+
+        series = query.subquery("series")
+        buckets = func.generate_series(
+            cast(literal(_bucket_start(start_date, time_frame).replace(tzinfo=None)), DateTime),
+            cast(literal(_bucket_start(end_date, time_frame).replace(tzinfo=None)), DateTime),
+            literal_column(f"interval '{_PERIOD_STEPS[time_frame]}'")
+        ).table_valued("bucket").alias("buckets")
+        bucket_date = cast(buckets.c.bucket, Date)
+
+        return select(
+            bucket_date.label("date"),
+            func.coalesce(series.c.revenue, 0).label("revenue"),
+            func.coalesce(series.c.count, 0).label("count")
+        ).select_from(
+            buckets.outerjoin(series, series.c.date == bucket_date)
+        ).order_by(
+            bucket_date
+        )
+
+    def _revenue_series_query(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        time_frame: TimeFrame,
+        tz: Optional[str] = None
+    ):
+        raise NotImplementedError
+
+    async def period_series(
+        self,
+        periods: List[Tuple[datetime, datetime]],
+        category_id: Optional[int] = None,
+        product_id: Optional[int] = None
+    ):
+        """
+        Daily series of every period in one statement: the ranges are a
+        VALUES list joined to the data and grouped by period.
+        """
+        raise NotImplementedError
+
+    async def category_revenue(self, start_date: datetime, end_date: datetime):
+        raise NotImplementedError
+
+    async def product_revenue(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        category_id: Optional[int] = None,
+        limit: int = 10,
+        ascending: bool = False
+    ):
+        raise NotImplementedError
+
+    async def _fetch(self, query):
+        result = await self.db.execute(query)
+        return result.fetchall()
+
+class RawAnalyticsBackend(AnalyticsBackend):
+    """
+    Aggregates the sales tables directly on every call.
+    """
+    name = "raw"
+
+    def _revenue_series_query(self, start_date, end_date, time_frame, tz=None):
+        # Buckets follow the wall clock of ``tz``; the range predicate stays on
+        # the bare created_at column so it can use the index
+        created_at = func.timezone(tz, Sale.created_at) if tz else Sale.created_at
+
+        if time_frame == TimeFrame.DAILY:
+            date_expr = func.date(created_at)
+        else:
+            date_expr = func.date(func.date_trunc(_TRUNC_UNITS[time_frame], created_at))
+
+        query = select(
+            date_expr.label("date"),
+            func.sum(Sale.total_amount).label("revenue"),
+            func.count(Sale.id).label("count")
+        ).filter(
+            Sale.created_at.between(start_date, end_date)
+        ).group_by(
+            date_expr
+        ).order_by(
+            date_expr
+        )
+
+        return query
+
+    async def period_series(self, periods, category_id=None, product_id=None):
+        ranges = _period_values(periods, DateTime(timezone=True))
+        date_expr = func.date(Sale.created_at)
+
+        query = select(
+            ranges.c.period,
+            date_expr.label("date"),
+            func.sum(Sale.total_amount).label("revenue"),
+            func.count(Sale.id).label("count")
+        ).select_from(
+            Sale
+        ).join(
+            ranges, Sale.created_at.between(ranges.c.start_date, ranges.c.end_date)
+        )
+
+        if category_id or product_id:
+            query = query.filter(SaleService.item_filter(product_id, category_id))
+
+        query = query.group_by(
+            ranges.c.period,
+            date_expr
+        ).order_by(
+            ranges.c.period,
+            date_expr
+        )
+
+        return await self._fetch(query)
+
+    async def category_revenue(self, start_date, end_date):
+        query = select(
+            Category.id.label("category_id"),
+            Category.name.label("category_name"),
+            func.sum(SaleItem.total).label("revenue")
+        ).join(
+            Sale, SaleItem.sale_id == Sale.id
+        ).join(
+            Product, SaleItem.product_id == Product.id
+        ).join(
+            Category, Product.category_id == Category.id
+        ).filter(
+            Sale.created_at.between(start_date, end_date)
+        ).group_by(
+            Category.id,
+            Category.name
+        ).order_by(
+            text("revenue DESC")
+        )
+
+        return await self._fetch(query)
+
+    async def product_revenue(self, start_date, end_date, category_id=None, limit=10, ascending=False):
+        query = select(
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+            Product.sku.label("product_sku"),
+            Category.name.label("category_name"),
+            func.sum(SaleItem.total).label("revenue"),
+            func.sum(SaleItem.quantity).label("quantity_sold")
+        ).join(
+            Sale, SaleItem.sale_id == Sale.id
+        ).join(
+            Product, SaleItem.product_id == Product.id
+        ).join(
+            Category, Product.category_id == Category.id
+        ).filter(
+            Sale.created_at.between(start_date, end_date)
+        )
+
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+
+        query = query.group_by(
+            Product.id,
+            Product.name,
+            Product.sku,
+            Category.name
+        ).order_by(
+            text("revenue ASC" if ascending else "revenue DESC")
+        ).limit(limit)
+
+        return await self._fetch(query)
+
+class RollupAnalyticsBackend(RawAnalyticsBackend):
+    """
+    Serves analytics from the daily rollup tables, so cost depends on the
+    number of days in the window rather than the number of sales.
+
+    Windows resolve to whole days. Period series filtered by product or
+    category need whole-sale totals, which the rollups do not keep, and
+    revenue series in an explicit timezone need days that the rollups (in
+    the session timezone) do not have; both fall back to the raw tables.
+    """
+    name = "rollup"
+
+    def _revenue_series_query(self, start_date, end_date, time_frame, tz=None):
+        if tz:
+            return super()._revenue_series_query(start_date, end_date, time_frame, tz)
+
+        if time_frame == TimeFrame.DAILY:
+            date_expr = DailyRevenueRollup.day
+        else:
+            date_expr = func.date(func.date_trunc(_TRUNC_UNITS[time_frame], DailyRevenueRollup.day))
+
+        query = select(
+            date_expr.label("date"),
+            func.sum(DailyRevenueRollup.revenue).label("revenue"),
+            func.sum(DailyRevenueRollup.sale_count).label("count")
+        ).filter(
+            DailyRevenueRollup.day.between(start_date.date(), end_date.date())
+        ).group_by(
+            date_expr
+        ).order_by(
+            date_expr
+        )
+
+        return query
+
+    async def period_series(self, periods, category_id=None, product_id=None):
+        if category_id or product_id:
+            return await super().period_series(periods, category_id, product_id)
+
+        ranges = _period_values(
+            [(start_date.date(), end_date.date()) for start_date, end_date in periods], Date
+        )
+
+        query = select(
+            ranges.c.period,
+            DailyRevenueRollup.day.label("date"),
+            func.sum(DailyRevenueRollup.revenue).label("revenue"),
+            func.sum(DailyRevenueRollup.sale_count).label("count")
+        ).select_from(
+            DailyRevenueRollup
+        ).join(
+            ranges, DailyRevenueRollup.day.between(ranges.c.start_date, ranges.c.end_date)
+        ).group_by(
+            ranges.c.period,
+            DailyRevenueRollup.day
+        ).order_by(
+            ranges.c.period,
+            DailyRevenueRollup.day
+        )
+
+        return await self._fetch(query)
+
+    async def category_revenue(self, start_date, end_date):
+        query = select(
+            Category.id.label("category_id"),
+            Category.name.label("category_name"),
+            func.sum(DailyCategoryRevenueRollup.revenue).label("revenue")
+        ).join(
+            Category, DailyCategoryRevenueRollup.category_id == Category.id
+        ).filter(
+            DailyCategoryRevenueRollup.day.between(start_date.date(), end_date.date())
+        ).group_by(
+            Category.id,
+            Category.name
+        ).order_by(
+            text("revenue DESC")
+        )
+
+        return await self._fetch(query)
+
+    async def product_revenue(self, start_date, end_date, category_id=None, limit=10, ascending=False):
+        query = select(
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+            Product.sku.label("product_sku"),
+            Category.name.label("category_name"),
+            func.sum(DailyProductRevenueRollup.revenue).label("revenue"),
+            func.sum(DailyProductRevenueRollup.quantity).label("quantity_sold")
+        ).join(
+            Product, DailyProductRevenueRollup.product_id == Product.id
+        ).join(
+            Category, Product.category_id == Category.id
+        ).filter(
+            DailyProductRevenueRollup.day.between(start_date.date(), end_date.date())
+        )
+
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+
+        query = query.group_by(
+            Product.id,
+            Product.name,
+            Product.sku,
+            Category.name
+        ).order_by(
+            text("revenue ASC" if ascending else "revenue DESC")
+        ).limit(limit)
+
+        return await self._fetch(query)
+
+class CachedAnalyticsBackend(AnalyticsBackend):
+    """
+    Serves results from the analytics cache, computing misses with another
+    backend (``ANALYTICS_CACHED_SOURCE``, the rollup backend by default).
+    Entries are invalidated when sales are written inside their window.
+    """
+    name = "cached"
+
+    def __init__(self, db: AsyncSession, source: Optional[AnalyticsBackend] = None, cache: Optional[AnalyticsCache] = None):
+        super().__init__(db)
+        self.source = source or create_backend(db, settings.analytics_cached_source)
+        self.cache = cache or analytics_cache
+
+    async def revenue_series(self, start_date, end_date, time_frame, tz=None, fill_gaps=False):
+        return await self._cached(
+            "revenue_series", start_date, end_date,
+            lambda: self.source.revenue_series(start_date, end_date, time_frame, tz, fill_gaps),
+            time_frame, tz, fill_gaps
+        )
+
+    async def revenue_metrics(self, start_date, end_date, time_frame, metrics, tz=None, fill_gaps=False):
+        return await self._cached(
+            "revenue_metrics", start_date, end_date,
+            lambda: self.source.revenue_metrics(start_date, end_date, time_frame, metrics, tz, fill_gaps),
+            time_frame, ",".join(sorted(metric.value for metric in metrics)), tz, fill_gaps
+        )
+
+    async def period_series(self, periods, category_id=None, product_id=None):
+        # Keyed and invalidated on the span covering every period
+        return await self._cached(
+            "period_series",
+            min(start_date for start_date, _ in periods),
+            max(end_date for _, end_date in periods),
+            lambda: self.source.period_series(periods, category_id, product_id),
+            category_id, product_id,
+            *(f"{start_date.isoformat()}/{end_date.isoformat()}" for start_date, end_date in periods)
+        )
+
+    async def category_revenue(self, start_date, end_date):
+        return await self._cached(
+            "category_revenue", start_date, end_date,
+            lambda: self.source.category_revenue(start_date, end_date)
+        )
+
+    async def product_revenue(self, start_date, end_date, category_id=None, limit=10, ascending=False):
+        return await self._cached(
+            "product_revenue", start_date, end_date,
+            lambda: self.source.product_revenue(start_date, end_date, category_id, limit, ascending),
+            category_id, limit, ascending
+        )
+
+    async def _cached(self, method, start_date, end_date, compute, *params):
+        key = ":".join(
+            [self.source.name, method, start_date.isoformat(), end_date.isoformat()] +
+            [str(getattr(param, "value", param)) for param in params]
+        )
+
+        async def compute_rows():
+            return [dict(row._mapping) for row in await compute()]
+
+        rows = await self.cache.get_or_compute(key, (start_date.date(), end_date.date()), compute_rows)
+
+        return [SimpleNamespace(**row) for row in rows]
+
+_TRUNC_UNITS = {
+    TimeFrame.WEEKLY: "week",
+    TimeFrame.MONTHLY: "month",
+    TimeFrame.YEARLY: "year",
+}
+
+# Bucket offsets of the previous period and of the same period a year earlier;
+# weekly buckets step 52 weeks back so weeks still start on a Monday
+_PERIOD_STEPS = {
+    TimeFrame.DAILY: "1 day",
+    TimeFrame.WEEKLY: "1 week",
+    TimeFrame.MONTHLY: "1 month",
+    TimeFrame.YEARLY: "1 year",
+}
+
+_YEAR_STEPS = {
+    TimeFrame.DAILY: "1 year",
+    TimeFrame.WEEKLY: "52 weeks",
+    TimeFrame.MONTHLY: "1 year",
+    TimeFrame.YEARLY: "1 year",
+}
+
+_METRIC_COLUMNS = {
+    RevenueMetric.MOVING_AVERAGE_7: "moving_average_7",
+    RevenueMetric.MOVING_AVERAGE_30: "moving_average_30",
+    RevenueMetric.PERIOD_OVER_PERIOD: "period_change",
+    RevenueMetric.YEAR_OVER_YEAR: "yoy_change",
+    RevenueMetric.MEDIAN_ORDER_VALUE: "median_order_value",
+    RevenueMetric.P90_ORDER_VALUE: "p90_order_value",
+}
+
+def _period_values(periods, type_):
+    return values(
+        column("period", Integer),
+        column("start_date", type_),
+        column("end_date", type_),
+        name="periods"
+    ).data([(index, start_date, end_date) for index, (start_date, end_date) in enumerate(periods)])
+
+def _lookback(time_frame: TimeFrame, metrics: List[RevenueMetric]) -> timedelta:
+    days = 0
+
+    if RevenueMetric.MOVING_AVERAGE_7 in metrics:
+        days = max(days, 6)
+
+    if RevenueMetric.MOVING_AVERAGE_30 in metrics:
+        days = max(days, 29)
+
+    if RevenueMetric.PERIOD_OVER_PERIOD in metrics:
+        days = max(days, {TimeFrame.DAILY: 1, TimeFrame.WEEKLY: 7, TimeFrame.MONTHLY: 31}.get(time_frame, 366))
+
+    if RevenueMetric.YEAR_OVER_YEAR in metrics:
+        days = max(days, 366)
+
+    return timedelta(days=days)
+
+def _bucket_start(moment: datetime, time_frame: TimeFrame) -> datetime:
+    moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if time_frame == TimeFrame.WEEKLY:
+        moment -= timedelta(days=moment.weekday())
+    elif time_frame == TimeFrame.MONTHLY:
+        moment = moment.replace(day=1)
+    elif time_frame == TimeFrame.YEARLY:
+        moment = moment.replace(month=1, day=1)
+
+    return moment
+
+BACKENDS = {
+    RawAnalyticsBackend.name: RawAnalyticsBackend,
+    RollupAnalyticsBackend.name: RollupAnalyticsBackend,
+    CachedAnalyticsBackend.name: CachedAnalyticsBackend,
+}
+
+def create_backend(db: AsyncSession, name: Optional[str] = None) -> AnalyticsBackend:
+    name = name or settings.analytics_backend
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown analytics backend '{name}', expected one of: {', '.join(BACKENDS)}")
+
+    return BACKENDS[name](db)
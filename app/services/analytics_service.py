@@ -1,32 +1,75 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from collections import defaultdict
+from types import SimpleNamespace
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_, text, extract
+from sqlalchemy import func
 
-from app.models.sale import Sale, SaleItem
-from app.models.product import Product
+from app.config import settings
 from app.models.category import Category
+from app.models.product import Product
+from app.models.sale import Sale
 from app.schemas.analytics import (
-    TimeFrame, AnalyticsFilter, ComparisonRequest, RevenuePoint,
-    RevenueData, ComparisonResult, CategoryRevenue, ProductRevenue
+    TimeFrame, RevenueMetric, ComparisonRequest, RevenueData, ComparisonResult,
+    CategoryRevenue, ProductRevenue
 )
+from app.services.analytics_backends import AnalyticsBackend, create_backend
+from app.sketches import ProductSketches, product_sketches, sale_day
+
+POINT_METRICS = ["moving_average_7", "moving_average_30", "period_change", "yoy_change"]
+WINDOW_METRICS = ["median_order_value", "p90_order_value"]
+
+# Boundary that windows snap to in aligned mode; coarser time frames
+# tolerate coarser (and therefore longer cacheable) windows
+ALIGNMENT_UNITS = {
+    None: "minute",
+    TimeFrame.DAILY: "minute",
+    TimeFrame.WEEKLY: "hour",
+    TimeFrame.MONTHLY: "day",
+    TimeFrame.YEARLY: "day",
+}
 
 class AnalyticsService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        backend: Optional[AnalyticsBackend] = None,
+        aligned: bool = False,
+        sketches: Optional[ProductSketches] = None
+    ):
         self.db = db
+        self.backend = backend or create_backend(db)
+        self.aligned = aligned
+        self.sketches = sketches or product_sketches
 
-    async def get_revenue(
+    def resolve_window(
         self,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        time_frame: TimeFrame = TimeFrame.DAILY
-    ) -> RevenueData:
+        time_frame: Optional[TimeFrame] = None,
+        tz: Optional[str] = None
+    ) -> Tuple[datetime, datetime]:
+        """
+        Apply the default window for the time frame and, in aligned mode, snap
+        both ends to the time frame's bucket boundary so repeated requests
+        produce identical windows. With ``tz``, naive bounds are read as wall
+        clock times in that timezone.
+        """
+        zone = _zone(tz) if tz else None
+
+        if start_date and zone and not start_date.tzinfo:
+            start_date = start_date.replace(tzinfo=zone)
+
+        if end_date and zone and not end_date.tzinfo:
+            end_date = end_date.replace(tzinfo=zone)
+
         if not end_date:
-            end_date = datetime.now()
-        
+            end_date = datetime.now(zone)
+
         if not start_date:
-            if time_frame == TimeFrame.DAILY:
+            if time_frame in (None, TimeFrame.DAILY):
                 start_date = end_date - timedelta(days=30)
             elif time_frame == TimeFrame.WEEKLY:
                 start_date = end_date - timedelta(weeks=12)
@@ -34,131 +77,116 @@ class AnalyticsService:
                 start_date = end_date - timedelta(days=365)
             else:
                 start_date = end_date - timedelta(days=5*365)
-        
-        if time_frame == TimeFrame.DAILY:
-            date_trunc = text("DATE(created_at)")
-        elif time_frame == TimeFrame.WEEKLY:
-            date_trunc = text("DATE(DATE_TRUNC('week', created_at))")
-        elif time_frame == TimeFrame.MONTHLY:
-            date_trunc = text("DATE(DATE_TRUNC('month', created_at))")
-        else:
-            date_trunc = text("DATE(DATE_TRUNC('year', created_at))")
-        
-        query = select(
-            date_trunc.label("date"),
-            func.sum(Sale.total_amount).label("revenue"),
-            func.count(Sale.id).label("count")
-        ).filter(
-            Sale.created_at.between(start_date, end_date)
-        ).group_by(
-            text("date")
-        ).order_by(
-            text("date")
-        )
-        
-        result = await self.db.execute(query)
-        rows = result.fetchall()
-        
-        total_revenue = sum(row.revenue for row in rows)
-        total_count = sum(row.count for row in rows)
-        average_revenue = total_revenue / len(rows) if rows else 0
-        
-        data = [
+
+        if self.aligned:
+            unit = ALIGNMENT_UNITS[time_frame]
+            start_date, end_date = _floor(start_date, unit), _floor(end_date, unit)
+
+        return start_date, end_date
+
+    def max_age(
+        self,
+        time_frame: Optional[TimeFrame] = None,
+        tz: Optional[str] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """
+        Seconds until the current aligned window moves to the next boundary,
+        in ``tz`` when the window was resolved there. A window ending today
+        includes today's partial data, which every sale changes, so it is
+        cacheable for the analytics cache TTL at most.
+        """
+        unit = ALIGNMENT_UNITS[time_frame]
+        now = datetime.now(_zone(tz) if tz else None)
+        next_boundary = _floor(now, unit) + _UNIT_STEPS[unit]
+
+        # Compare instants, wall clock differences are off across DST changes
+        seconds = next_boundary.timestamp() - now.timestamp()
+
+        if end_date is not None and end_date.date() >= now.date():
+            seconds = min(seconds, settings.analytics_cache_ttl)
+
+        return max(1, int(seconds))
+
+    async def data_version(self) -> str:
+        """
+        Cheap version of the data the analytics read. Sales are append-only,
+        so the highest sale id changes with them; products and categories are
+        edited in place, so their latest update and their count (for deletes)
+        are part of it too.
+        """
+        result = await self.db.execute(select(
+            select(func.max(Sale.id)).scalar_subquery(),
+            select(func.max(Product.updated_at)).scalar_subquery(),
+            select(func.count(Product.id)).scalar_subquery(),
+            select(func.max(Category.updated_at)).scalar_subquery(),
+            select(func.count(Category.id)).scalar_subquery()
+        ))
+
+        return ":".join(str(value) for value in result.one())
+
+    async def get_revenue(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        time_frame: TimeFrame = TimeFrame.DAILY,
+        metrics: Optional[List[RevenueMetric]] = None,
+        tz: Optional[str] = None,
+        fill_gaps: bool = False
+    ) -> RevenueData:
+        start_date, end_date = self.resolve_window(start_date, end_date, time_frame, tz)
+
+        if not metrics:
+            rows = await self.backend.revenue_series(start_date, end_date, time_frame, tz, fill_gaps)
+
+            return self._revenue_data(rows)
+
+        if time_frame != TimeFrame.DAILY and (
+            RevenueMetric.MOVING_AVERAGE_7 in metrics or RevenueMetric.MOVING_AVERAGE_30 in metrics
+        ):
+            raise ValueError("Moving averages require the daily time frame")
+
+        rows = await self.backend.revenue_metrics(start_date, end_date, time_frame, metrics, tz, fill_gaps)
+
+        return self._revenue_data(rows)
+
+    async def compare_periods(self, comparison: ComparisonRequest) -> ComparisonResult:
+        ranges = comparison.period_ranges()
+
+        rows = await self.backend.period_series(ranges, comparison.category_id, comparison.product_id)
+
+        rows_by_period = defaultdict(list)
+
+        for row in rows:
+            rows_by_period[row.period].append(row)
+
+        periods = [
             {
-                "date": row.date,
-                "revenue": float(row.revenue),
-                "count": row.count
+                "start_date": start_date,
+                "end_date": end_date,
+                **self._revenue_data(rows_by_period[index])
             }
-            for row in rows
+            for index, (start_date, end_date) in enumerate(ranges)
         ]
-        
-        return {
-            "data": data,
-            "total_revenue": float(total_revenue),
-            "average_revenue": float(average_revenue),
-            "total_count": total_count
-        }
-
-    async def compare_periods(self, comparison: ComparisonRequest) -> ComparisonResult:
-        first_period = await self._get_period_data(
-            comparison.first_period_start, 
-            comparison.first_period_end,
-            comparison.category_id,
-            comparison.product_id
-        )
-        
-        second_period = await self._get_period_data(
-            comparison.second_period_start,
-            comparison.second_period_end,
-            comparison.category_id,
-            comparison.product_id
-        )
-        
-        if first_period["total_revenue"] == 0:
-            percentage_change = 100.0 if second_period["total_revenue"] > 0 else 0.0
-        else:
-            percentage_change = (
-                (second_period["total_revenue"] - first_period["total_revenue"]) / 
-                first_period["total_revenue"] * 100
-            )
-        
-        return {
-            "first_period": first_period,
-            "second_period": second_period,
-            "percentage_change": float(percentage_change)
-        }
 
-    async def _get_period_data(self, start, end, category_id=None, product_id=None):
-        query = select(
-            func.date(Sale.created_at).label("date"),
-            func.sum(Sale.total_amount).label("revenue"),
-            func.count(Sale.id).label("count")
-        ).filter(
-            Sale.created_at.between(start, end)
-        )
-        
-        if category_id or product_id:
-            sale_id_query = select(SaleItem.sale_id).distinct()
-            
-            if product_id:
-                sale_id_query = sale_id_query.filter(SaleItem.product_id == product_id)
-            
-            if category_id:
-                sale_id_query = sale_id_query.join(Product, SaleItem.product_id == Product.id).filter(
-                    Product.category_id == category_id
-                )
-            
-            sale_id_result = await self.db.execute(sale_id_query)
-            sale_ids = [row[0] for row in sale_id_result]
-            
-            if not sale_ids:
-                return {"data": [], "total_revenue": 0, "average_revenue": 0, "total_count": 0}
-            
-            query = query.filter(Sale.id.in_(sale_ids))
-        
-        query = query.group_by(text("date")).order_by(text("date"))
-        
-        result = await self.db.execute(query)
-        rows = result.fetchall()
-        
-        total_revenue = sum(row.revenue for row in rows)
-        total_count = sum(row.count for row in rows)
-        average_revenue = total_revenue / len(rows) if rows else 0
-        
-        data = [
+        changes = [
             {
-                "date": row.date,
-                "revenue": float(row.revenue),
-                "count": row.count
+                "from_period": first,
+                "to_period": second,
+                "percentage_change": _percentage_change(
+                    periods[first]["total_revenue"], periods[second]["total_revenue"]
+                )
             }
-            for row in rows
+            for first in range(len(periods))
+            for second in range(first + 1, len(periods))
         ]
-        
+
         return {
-            "data": data,
-            "total_revenue": float(total_revenue),
-            "average_revenue": float(average_revenue),
-            "total_count": total_count
+            "first_period": periods[0],
+            "second_period": periods[1],
+            "percentage_change": changes[0]["percentage_change"],
+            "periods": periods,
+            "changes": changes
         }
 
     async def get_category_revenue(
@@ -166,36 +194,12 @@ class AnalyticsService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> List[CategoryRevenue]:
-        if not end_date:
-            end_date = datetime.now()
-        
-        if not start_date:
-            start_date = end_date - timedelta(days=30)
-        
-        query = select(
-            Category.id.label("category_id"),
-            Category.name.label("category_name"),
-            func.sum(Sale.total_amount).label("revenue")
-        ).join(
-            SaleItem, Sale.id == SaleItem.sale_id
-        ).join(
-            Product, SaleItem.product_id == Product.id
-        ).join(
-            Category, Product.category_id == Category.id
-        ).filter(
-            Sale.created_at.between(start_date, end_date)
-        ).group_by(
-            Category.id,
-            Category.name
-        ).order_by(
-            text("revenue DESC")
-        )
-        
-        result = await self.db.execute(query)
-        rows = result.fetchall()
-        
+        start_date, end_date = self.resolve_window(start_date, end_date)
+
+        rows = await self.backend.category_revenue(start_date, end_date)
+
         total_revenue = sum(row.revenue for row in rows)
-        
+
         categories = [
             {
                 "category_id": row.category_id,
@@ -205,7 +209,7 @@ class AnalyticsService:
             }
             for row in rows
         ]
-        
+
         return categories
 
     async def get_product_revenue(
@@ -213,104 +217,114 @@ class AnalyticsService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         category_id: Optional[int] = None,
-        limit: int = 10
+        limit: int = 10,
+        approx: bool = False
     ) -> List[ProductRevenue]:
-        if not end_date:
-            end_date = datetime.now()
-        
-        if not start_date:
-            start_date = end_date - timedelta(days=30)
-        
+        start_date, end_date = self.resolve_window(start_date, end_date)
+
+        if approx:
+            rows = await self._approx_product_revenue(start_date, end_date, category_id, limit)
+        else:
+            rows = await self.backend.product_revenue(start_date, end_date, category_id, limit)
+
+        return self._product_revenue(rows)
+
+    async def get_low_performing_products(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 10,
+        approx: bool = False
+    ) -> List[ProductRevenue]:
+        start_date, end_date = self.resolve_window(start_date, end_date)
+
+        if approx:
+            rows = await self._approx_product_revenue(start_date, end_date, limit=limit, ascending=True)
+        else:
+            rows = await self.backend.product_revenue(start_date, end_date, limit=limit, ascending=True)
+
+        return self._product_revenue(rows)
+
+    def approx_error_bound(self, start_date: datetime, end_date: datetime) -> float:
+        """
+        Revenue by which an approximate product estimate of the window may
+        exceed the exact value (with probability 1 - e^-depth)
+        """
+        return self.sketches.error_bound(sale_day(start_date), sale_day(end_date))
+
+    async def _approx_product_revenue(self, start_date, end_date, category_id=None, limit=10, ascending=False):
+        """
+        Rank products by their sketch estimates over the window's days. The
+        top comes from the heavy-hitter candidates; the bottom ranks every
+        product, keeping those with a non-zero estimate (estimates never
+        undercount, so zero means no sales). Only product details are queried.
+        """
+        start_day, end_day = sale_day(start_date), sale_day(end_date)
+
         query = select(
             Product.id.label("product_id"),
             Product.name.label("product_name"),
             Product.sku.label("product_sku"),
-            Category.name.label("category_name"),
-            func.sum(SaleItem.total).label("revenue"),
-            func.sum(SaleItem.quantity).label("quantity_sold")
-        ).join(
-            Sale, SaleItem.sale_id == Sale.id
-        ).join(
-            Product, SaleItem.product_id == Product.id
+            Category.name.label("category_name")
         ).join(
             Category, Product.category_id == Category.id
-        ).filter(
-            Sale.created_at.between(start_date, end_date)
         )
-        
+
         if category_id:
             query = query.filter(Product.category_id == category_id)
-        
-        query = query.group_by(
-            Product.id,
-            Product.name,
-            Product.sku,
-            Category.name
-        ).order_by(
-            text("revenue DESC")
-        ).limit(limit)
-        
+
+        if not ascending:
+            query = query.filter(Product.id.in_(self.sketches.candidates(start_day, end_day)))
+
         result = await self.db.execute(query)
-        rows = result.fetchall()
-        
+        products = {row.product_id: row for row in result}
+
+        estimates = [
+            estimate for estimate in self.sketches.estimate(products, start_day, end_day)
+            if estimate[1] > 0
+        ]
+        estimates.sort(key=lambda estimate: estimate[1], reverse=not ascending)
+
+        return [
+            SimpleNamespace(
+                product_id=product_id,
+                product_name=products[product_id].product_name,
+                product_sku=products[product_id].product_sku,
+                category_name=products[product_id].category_name,
+                revenue=revenue,
+                quantity_sold=round(quantity)
+            )
+            for product_id, revenue, quantity in estimates[:limit]
+        ]
+
+    @staticmethod
+    def _revenue_data(rows) -> dict:
         total_revenue = sum(row.revenue for row in rows)
-        
-        products = [
+        total_count = sum(row.count for row in rows)
+        average_revenue = total_revenue / len(rows) if rows else 0
+
+        data = [
             {
-                "product_id": row.product_id,
-                "product_name": row.product_name,
-                "product_sku": row.product_sku,
-                "category_name": row.category_name,
+                "date": row.date,
                 "revenue": float(row.revenue),
-                "quantity_sold": row.quantity_sold,
-                "percentage": float(row.revenue / total_revenue * 100) if total_revenue else 0
+                "count": row.count,
+                **_optional_floats(row, POINT_METRICS)
             }
             for row in rows
         ]
-        
-        return products
 
-    async def get_low_performing_products(
-        self,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
-        limit: int = 10
-    ) -> List[ProductRevenue]:
-        if not end_date:
-            end_date = datetime.now()
-        
-        if not start_date:
-            start_date = end_date - timedelta(days=30)
-        
-        query = select(
-            Product.id.label("product_id"),
-            Product.name.label("product_name"),
-            Product.sku.label("product_sku"),
-            Category.name.label("category_name"),
-            func.sum(SaleItem.total).label("revenue"),
-            func.sum(SaleItem.quantity).label("quantity_sold")
-        ).join(
-            Sale, SaleItem.sale_id == Sale.id
-        ).join(
-            Product, SaleItem.product_id == Product.id
-        ).join(
-            Category, Product.category_id == Category.id
-        ).filter(
-            Sale.created_at.between(start_date, end_date)
-        ).group_by(
-            Product.id,
-            Product.name,
-            Product.sku,
-            Category.name
-        ).order_by(
-            text("revenue ASC")
-        ).limit(limit)
-        
-        result = await self.db.execute(query)
-        rows = result.fetchall()
-        
+        return {
+            "data": data,
+            "total_revenue": float(total_revenue),
+            "average_revenue": float(average_revenue),
+            "total_count": total_count,
+            **(_optional_floats(rows[0], WINDOW_METRICS) if rows else {})
+        }
+
+    @staticmethod
+    def _product_revenue(rows) -> List[dict]:
         total_revenue = sum(row.revenue for row in rows)
-        
+
         products = [
             {
                 "product_id": row.product_id,
@@ -323,5 +337,47 @@ class AnalyticsService:
             }
             for row in rows
         ]
-        
-        return products 
\ No newline at end of file
+
+        return products
+
+def _percentage_change(first: float, second: float) -> float:
+    if first == 0:
+        return 100.0 if second > 0 else 0.0
+
+    return float((second - first) / first * 100)
+
+def _zone(tz: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{tz}'")
+
+def _optional_floats(row, names) -> dict:
+    """
+    The metric columns present on a row, so responses only carry requested metrics
+    """
+    values = {}
+
+    for name in names:
+        if hasattr(row, name):
+            value = getattr(row, name)
+            values[name] = float(value) if value is not None else None
+
+    return values
+
+_UNIT_STEPS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+def _floor(moment: datetime, unit: str) -> datetime:
+    moment = moment.replace(second=0, microsecond=0)
+
+    if unit in ("hour", "day"):
+        moment = moment.replace(minute=0)
+
+    if unit == "day":
+        moment = moment.replace(hour=0)
+
+    return moment
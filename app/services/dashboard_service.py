@@ -0,0 +1,86 @@
+from typing import Optional
+from datetime import datetime
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+from app.schemas.analytics import TimeFrame
+from app.services.analytics_service import AnalyticsService
+
+class DashboardService:
+    """
+    Runs the independent dashboard queries concurrently. An asyncpg connection
+    executes one statement at a time, so every query gets its own session
+    (and pooled connection) from ``session_factory``. At most ``concurrency``
+    queries are in flight; one exceeding ``timeout`` seconds (connection
+    checkout included) is cancelled, in the database too, and reported in
+    ``errors`` like any database error instead of failing the whole dashboard.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        aligned: bool = False,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.aligned = aligned
+        self.concurrency = concurrency or settings.analytics_dashboard_concurrency
+        self.timeout = timeout or settings.analytics_query_timeout
+
+    async def get_dashboard(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        time_frame: TimeFrame = TimeFrame.DAILY,
+        category_id: Optional[int] = None,
+        limit: int = 10
+    ) -> dict:
+        # Resolve the window once so every section covers the same period,
+        # instead of each query reading the clock when it happens to start
+        start_date, end_date = AnalyticsService(None, aligned=self.aligned).resolve_window(
+            start_date, end_date, time_frame
+        )
+
+        queries = {
+            "revenue": lambda service: service.get_revenue(start_date, end_date, time_frame),
+            "category_revenue": lambda service: service.get_category_revenue(start_date, end_date),
+            "product_revenue": lambda service: service.get_product_revenue(start_date, end_date, category_id, limit),
+            "low_performing_products": lambda service: service.get_low_performing_products(start_date, end_date, limit),
+        }
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*(self._run(semaphore, name, query) for name, query in queries.items()))
+
+        dashboard = {"errors": {}}
+
+        for name, (result, error) in zip(queries, outcomes):
+            dashboard[name] = result
+
+            if error:
+                dashboard["errors"][name] = error
+
+        return dashboard
+
+    async def _run(self, semaphore: asyncio.Semaphore, name: str, query):
+        async with semaphore:
+            # The pool checkout counts against the timeout too, so a
+            # saturated pool cannot hold a panel longer than its query could
+            try:
+                result = await asyncio.wait_for(self._query(query), self.timeout)
+            except asyncio.TimeoutError:
+                return None, f"{name} timed out after {self.timeout:g}s"
+            except DBAPIError as e:
+                # Including the server-side statement_timeout cancelling it
+                return None, f"{name} failed: {e.orig}"
+
+            return result, None
+
+    async def _query(self, query):
+        async with self.session_factory() as session:
+            # Stop the statement server-side as well when the client gives up
+            await session.execute(text(f"SET LOCAL statement_timeout = {int(self.timeout * 1000)}"))
+
+            return await query(AnalyticsService(session, aligned=self.aligned))
@@ -0,0 +1,166 @@
+from typing import AsyncIterator
+import csv
+import io
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.sale import Sale, SaleItem
+from app.models.product import Product
+from app.schemas.sale import SaleFilter
+from app.services.sale_service import SaleService
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 2000
+
+SALE_COLUMNS = [
+    "sale_id", "reference_number", "created_at", "payment_method",
+    "total_amount", "tax_amount", "discount_amount", "customer_name", "customer_email", "notes"
+]
+ITEM_COLUMNS = [
+    "item_id", "product_id", "product_name", "quantity", "price", "discount", "total"
+]
+
+class ExportService:
+    """
+    Streams sales with their items out of a server-side cursor, so an export
+    of any size is held in memory one batch at a time.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def export_query(self, filter_params: SaleFilter):
+        """
+        One row per sale item, joined to its sale and product name, ordered so
+        the items of a sale are adjacent. A sale without items still gets one
+        row, with empty item columns.
+        """
+        query = (
+            select(
+                Sale.id.label("sale_id"),
+                Sale.reference_number,
+                Sale.created_at,
+                Sale.payment_method,
+                Sale.total_amount,
+                Sale.tax_amount,
+                Sale.discount_amount,
+                Sale.customer_name,
+                Sale.customer_email,
+                Sale.notes,
+                SaleItem.id.label("item_id"),
+                SaleItem.product_id,
+                Product.name.label("product_name"),
+                SaleItem.quantity,
+                SaleItem.price,
+                SaleItem.discount,
+                SaleItem.total
+            )
+            .outerjoin(SaleItem, SaleItem.sale_id == Sale.id)
+            .outerjoin(Product, Product.id == SaleItem.product_id)
+            .order_by(Sale.created_at, Sale.id, SaleItem.id)
+        )
+
+        conditions = SaleService.sale_filters(filter_params)
+
+        if conditions is not None:
+            query = query.filter(conditions)
+
+        return query
+
+    async def _batches(self, filter_params: SaleFilter, batch_size: int):
+        query = self.export_query(filter_params).execution_options(yield_per=batch_size)
+        result = await self.db.stream(query)
+
+        async for batch in result.partitions():
+            yield batch
+
+    async def stream_csv(self, filter_params: SaleFilter, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+        """
+        CSV with a header and one line per sale item
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(SALE_COLUMNS + ITEM_COLUMNS)
+
+        async for batch in self._batches(filter_params, batch_size):
+            for row in batch:
+                writer.writerow(self._csv_row(row))
+
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    async def stream_ndjson(self, filter_params: SaleFilter, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+        """
+        NDJSON with one sale per line and its items nested, in the shape of
+        SaleResponse. Only the sale currently being assembled is kept around.
+        """
+        current = None
+
+        async for batch in self._batches(filter_params, batch_size):
+            lines = []
+
+            for row in batch:
+                if current is None or current["id"] != row.sale_id:
+                    if current is not None:
+                        lines.append(json.dumps(current))
+
+                    current = self._sale(row)
+
+                if row.item_id is not None:
+                    current["items"].append(self._item(row))
+
+            if lines:
+                yield ("\n".join(lines) + "\n").encode()
+
+        if current is not None:
+            yield (json.dumps(current) + "\n").encode()
+
+    @staticmethod
+    def _csv_row(row) -> list:
+        values = []
+
+        for column in SALE_COLUMNS + ITEM_COLUMNS:
+            value = getattr(row, column)
+
+            if column == "created_at":
+                value = value.isoformat() if value else ""
+            elif column == "payment_method":
+                value = value.value
+
+            values.append(value)
+
+        return values
+
+    @staticmethod
+    def _sale(row) -> dict:
+        return {
+            "id": row.sale_id,
+            "reference_number": row.reference_number,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "payment_method": row.payment_method.value,
+            "total_amount": row.total_amount,
+            "tax_amount": row.tax_amount,
+            "discount_amount": row.discount_amount,
+            "customer_name": row.customer_name,
+            "customer_email": row.customer_email,
+            "notes": row.notes,
+            "items": []
+        }
+
+    @staticmethod
+    def _item(row) -> dict:
+        return {
+            "id": row.item_id,
+            "sale_id": row.sale_id,
+            "product_id": row.product_id,
+            "product_name": row.product_name,
+            "quantity": row.quantity,
+            "price": row.price,
+            "discount": row.discount,
+            "total": row.total
+        }
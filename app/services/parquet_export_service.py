@@ -0,0 +1,248 @@
+from contextlib import contextmanager
+from typing import Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import asyncio
+import fcntl
+import json
+import os
+import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import Numeric, cast, func, literal, tuple_
+
+from app.models.sale import Sale, SaleItem
+from app.models.product import Product
+from app.models.category import Category
+
+# Rows fetched from the server-side cursor and written per Parquet row group
+PARQUET_BATCH_SIZE = 50000
+
+# Sales younger than this are left for the next run, so transactions still
+# in flight (created_at is their start time) cannot slip behind the watermark.
+# Runs read the primary; a replica's lag would have to be added on top
+SETTLE_INTERVAL = timedelta(minutes=5)
+
+WATERMARK_FILE = "_watermark.json"
+
+# Held with flock for the duration of a run; the OS releases it if the
+# process dies, so a crashed run never leaves the directory locked
+LOCK_FILE = "_export.lock"
+
+MONEY = Numeric(12, 2)
+
+class ExportInProgress(Exception):
+    pass
+
+@contextmanager
+def export_lock(output_dir: str):
+    """
+    Exclusive lock on an output directory, across tasks and processes
+    (workers, the CLI) on this host. Concurrent runs would both export the
+    rows after the same watermark and then both advance it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    fd = os.open(os.path.join(output_dir, LOCK_FILE), os.O_CREAT | os.O_RDWR, 0o644)
+
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ExportInProgress(f"A Parquet export into {output_dir} is already running")
+
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package")
+
+    return pyarrow, pyarrow.parquet
+
+def arrow_schema(pa):
+    money = pa.decimal128(12, 2)
+
+    return pa.schema([
+        ("sale_id", pa.int32()),
+        ("reference_number", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("payment_method", pa.string()),
+        ("total_amount", money),
+        ("tax_amount", money),
+        ("discount_amount", money),
+        ("item_id", pa.int32()),
+        ("product_id", pa.int32()),
+        ("product_sku", pa.string()),
+        ("product_name", pa.string()),
+        ("category_id", pa.int32()),
+        ("category_name", pa.string()),
+        ("quantity", pa.int32()),
+        ("price", money),
+        ("discount", money),
+        ("total", money),
+    ])
+
+class ParquetExportService:
+    """
+    Incremental export of the sales fact table (sales joined with items,
+    products and categories) to Parquet files partitioned by month:
+
+        <output_dir>/month=YYYY-MM/part-<timestamp>-<id>.parquet
+
+    Each run exports the sales after the watermark stored in the output
+    directory, then advances it. Money is exported as decimal(12, 2).
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def fact_query(self, after: Optional[Tuple[datetime, int]] = None):
+        query = (
+            select(
+                Sale.id.label("sale_id"),
+                Sale.reference_number,
+                Sale.created_at,
+                Sale.payment_method,
+                cast(Sale.total_amount, MONEY).label("total_amount"),
+                cast(Sale.tax_amount, MONEY).label("tax_amount"),
+                cast(Sale.discount_amount, MONEY).label("discount_amount"),
+                SaleItem.id.label("item_id"),
+                SaleItem.product_id,
+                Product.sku.label("product_sku"),
+                Product.name.label("product_name"),
+                Product.category_id,
+                Category.name.label("category_name"),
+                SaleItem.quantity,
+                cast(SaleItem.price, MONEY).label("price"),
+                cast(SaleItem.discount, MONEY).label("discount"),
+                cast(SaleItem.total, MONEY).label("total")
+            )
+            .join(SaleItem, SaleItem.sale_id == Sale.id)
+            .join(Product, Product.id == SaleItem.product_id)
+            .join(Category, Category.id == Product.category_id)
+            .filter(Sale.created_at < func.now() - SETTLE_INTERVAL)
+            .order_by(Sale.created_at, Sale.id, SaleItem.id)
+        )
+
+        if after:
+            query = query.filter(
+                tuple_(Sale.created_at, Sale.id) > tuple_(
+                    literal(after[0], Sale.created_at.type), literal(after[1], Sale.id.type)
+                )
+            )
+
+        return query
+
+    async def export(self, output_dir: str, batch_size: int = PARQUET_BATCH_SIZE) -> dict:
+        """
+        Raises ExportInProgress when another run holds the directory
+        """
+        pa, pq = _pyarrow()
+
+        with export_lock(output_dir):
+            return await self._export(pa, pq, output_dir, batch_size)
+
+    async def _export(self, pa, pq, output_dir: str, batch_size: int) -> dict:
+        schema = arrow_schema(pa)
+
+        watermark = read_watermark(output_dir)
+        after = (watermark["created_at"], watermark["sale_id"]) if watermark else None
+        # Time-ordered, and unique even for runs started within the same second
+        run = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        query = self.fact_query(after).execution_options(yield_per=batch_size)
+        result = await self.db.stream(query)
+
+        writer = None
+        month = None
+        pending = []
+        rows = 0
+        last = None
+
+        try:
+            async for batch in result.partitions():
+                # Rows arrive in time order, so at most one month is open at a time
+                for batch_month, month_rows in _split_by_month(batch):
+                    if batch_month != month:
+                        if writer:
+                            await asyncio.to_thread(writer.close)
+
+                        month = batch_month
+                        path = os.path.join(output_dir, f"month={month}", f"part-{run}.parquet")
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        pending.append(path)
+                        writer = pq.ParquetWriter(path + ".tmp", schema, compression="zstd")
+
+                    await asyncio.to_thread(_write_rows, writer, pa, schema, month_rows)
+
+                rows += len(batch)
+                last = batch[-1]
+        except BaseException:
+            if writer:
+                writer.close()
+
+            for path in pending:
+                if os.path.exists(path + ".tmp"):
+                    os.remove(path + ".tmp")
+
+            raise
+
+        if writer:
+            await asyncio.to_thread(writer.close)
+
+        # Publish the files, then move the watermark past them
+        for path in pending:
+            os.replace(path + ".tmp", path)
+
+        if last is not None:
+            watermark = {"created_at": last.created_at, "sale_id": last.sale_id}
+            write_watermark(output_dir, watermark)
+
+        return {
+            "rows": rows,
+            "files": pending,
+            "watermark": watermark["created_at"] if watermark else None
+        }
+
+def read_watermark(output_dir: str) -> Optional[dict]:
+    path = os.path.join(output_dir, WATERMARK_FILE)
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        data = json.load(f)
+
+    return {"created_at": datetime.fromisoformat(data["created_at"]), "sale_id": data["sale_id"]}
+
+def write_watermark(output_dir: str, watermark: dict):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, WATERMARK_FILE)
+
+    with open(path + ".tmp", "w") as f:
+        json.dump({"created_at": watermark["created_at"].isoformat(), "sale_id": watermark["sale_id"]}, f)
+
+    os.replace(path + ".tmp", path)
+
+def _split_by_month(batch):
+    groups = []
+
+    for row in batch:
+        month = row.created_at.astimezone(timezone.utc).strftime("%Y-%m")
+
+        if not groups or groups[-1][0] != month:
+            groups.append((month, []))
+
+        groups[-1][1].append(row)
+
+    return groups
+
+def _write_rows(writer, pa, schema, rows):
+    columns = {name: [getattr(row, name) for row in rows] for name in schema.names}
+    columns["payment_method"] = [value.value for value in columns["payment_method"]]
+
+    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
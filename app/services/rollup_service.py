@@ -0,0 +1,146 @@
+from typing import List, Optional
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, delete, literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.sale import Sale, SaleItem
+from app.models.product import Product
+from app.models.rollup import (
+    DailyRevenueRollup, DailyCategoryRevenueRollup, DailyProductRevenueRollup
+)
+
+# Rows per day of daily_revenue_rollup; a connection always writes the same one
+REVENUE_SHARDS = 16
+
+ROLLUP_TABLES = [
+    DailyRevenueRollup.__table__,
+    DailyCategoryRevenueRollup.__table__,
+    DailyProductRevenueRollup.__table__,
+]
+
+class RollupService:
+    """
+    Maintains the daily revenue rollup tables.
+
+    Days are computed with DATE(created_at) in the database session timezone,
+    the same bucketing the analytics queries used against the raw sales table.
+
+    Upserts lock their rows in key order, so transactions touching the same
+    days, categories and products wait on each other instead of deadlocking.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def apply_sales(self, sale_ids: List[int]):
+        """
+        Add the given (already flushed) sales to the rollups.
+        """
+        if not sale_ids:
+            return
+
+        sale_filter = Sale.id.in_(sale_ids)
+
+        await self.db.execute(self._upsert(
+            DailyRevenueRollup,
+            self._revenue_query(func.pg_backend_pid() % REVENUE_SHARDS).filter(sale_filter),
+            ["day", "shard"],
+            ["revenue", "sale_count"]
+        ))
+        await self.db.execute(self._upsert(
+            DailyCategoryRevenueRollup,
+            self._category_query().filter(sale_filter),
+            ["day", "category_id"],
+            ["revenue", "quantity", "sale_count"]
+        ))
+        await self.db.execute(self._upsert(
+            DailyProductRevenueRollup,
+            self._product_query().filter(sale_filter),
+            ["day", "product_id"],
+            ["revenue", "quantity", "sale_count"]
+        ))
+
+    async def rebuild(self, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        """
+        Recompute the rollups from the raw sales tables, either entirely or
+        for the inclusive day range given.
+        """
+        day_expr = func.date(Sale.created_at)
+
+        for model, query in (
+            (DailyRevenueRollup, self._revenue_query()),
+            (DailyCategoryRevenueRollup, self._category_query()),
+            (DailyProductRevenueRollup, self._product_query()),
+        ):
+            delete_query = delete(model)
+
+            if start_date:
+                delete_query = delete_query.where(model.day >= start_date)
+                query = query.filter(day_expr >= start_date)
+
+            if end_date:
+                delete_query = delete_query.where(model.day <= end_date)
+                query = query.filter(day_expr <= end_date)
+
+            await self.db.execute(delete_query)
+            await self.db.execute(
+                insert(model).from_select([column.name for column in query.selected_columns], query)
+            )
+
+    @staticmethod
+    def _upsert(model, query, key_columns, sum_columns):
+        query = query.order_by(*(query.selected_columns[name] for name in key_columns))
+        statement = insert(model).from_select(
+            [column.name for column in query.selected_columns], query
+        )
+
+        return statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={
+                name: getattr(model, name) + getattr(statement.excluded, name)
+                for name in sum_columns
+            }
+        )
+
+    @staticmethod
+    def _revenue_query(shard=literal_column("0")):
+        day_expr = func.date(Sale.created_at)
+
+        return select(
+            day_expr.label("day"),
+            shard.label("shard"),
+            func.sum(Sale.total_amount).label("revenue"),
+            func.count(Sale.id).label("sale_count")
+        ).group_by(day_expr)
+
+    @staticmethod
+    def _category_query():
+        day_expr = func.date(Sale.created_at)
+
+        return select(
+            day_expr.label("day"),
+            Product.category_id.label("category_id"),
+            func.sum(SaleItem.total).label("revenue"),
+            func.sum(SaleItem.quantity).label("quantity"),
+            func.count(func.distinct(Sale.id)).label("sale_count")
+        ).join(
+            SaleItem, Sale.id == SaleItem.sale_id
+        ).join(
+            Product, SaleItem.product_id == Product.id
+        ).group_by(day_expr, Product.category_id)
+
+    @staticmethod
+    def _product_query():
+        day_expr = func.date(Sale.created_at)
+
+        return select(
+            day_expr.label("day"),
+            SaleItem.product_id.label("product_id"),
+            func.sum(SaleItem.total).label("revenue"),
+            func.sum(SaleItem.quantity).label("quantity"),
+            func.count(func.distinct(Sale.id)).label("sale_count")
+        ).join(
+            SaleItem, Sale.id == SaleItem.sale_id
+        ).group_by(day_expr, SaleItem.product_id)
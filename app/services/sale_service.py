@@ -0,0 +1,320 @@
+from typing import Any, AsyncIterable, List, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy import Integer, and_, column, insert, update, values
+from sqlalchemy.exc import DBAPIError
+import uuid
+
+from app.cache import analytics_cache
+from app.low_stock import notify_changes
+from app.metrics import sale_items_ingested_total, sales_ingested_total
+from app.sketch_feed import notify_sale_items
+from app.models.sale import Sale, SaleItem
+from app.models.product import Product
+from app.models.inventory import Inventory, InventoryChange
+from app.schemas.sale import SaleCreate, SaleFilter
+from app.services.rollup_service import RollupService
+
+# Sales per transaction for bulk ingestion
+BULK_CHUNK_SIZE = 500
+
+class SaleService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_sale(self, sale: SaleCreate) -> dict:
+        """
+        Record a sale, its items, the inventory decrement and the rollup update
+        in a single transaction with a constant number of statements.
+        """
+        [(sale_id, _, created_at)] = await self.insert_sales([sale])
+        
+        await self.db.commit()
+        await analytics_cache.invalidate_timestamps([created_at])
+        sales_ingested_total.inc("single")
+        sale_items_ingested_total.inc("single", amount=len(sale.items))
+        
+        return await self.get_sale(sale_id)
+
+    async def bulk_create_sales(self, payloads: AsyncIterable[Any], chunk_size: int = BULK_CHUNK_SIZE) -> dict:
+        """
+        Ingest a stream of raw sale payloads in chunks, committing each chunk.
+
+        Invalid payloads and sales referencing unknown products are reported
+        per row; a database error fails only the chunk it occurred in.
+        """
+        results = []
+        chunk = []
+        index = 0
+        
+        async for payload in payloads:
+            try:
+                if isinstance(payload, Exception):
+                    raise payload
+                chunk.append((index, SaleCreate.parse_obj(payload)))
+            except ValueError as e:
+                results.append({"index": index, "status": "error", "error": str(e)})
+            
+            index += 1
+            
+            if len(chunk) >= chunk_size:
+                results.extend(await self._ingest_chunk(chunk))
+                chunk = []
+        
+        if chunk:
+            results.extend(await self._ingest_chunk(chunk))
+        
+        results.sort(key=lambda result: result["index"])
+        created = sum(1 for result in results if result["status"] == "created")
+        
+        return {
+            "created": created,
+            "failed": len(results) - created,
+            "results": results
+        }
+
+    async def _ingest_chunk(self, chunk: List[Tuple[int, SaleCreate]]) -> List[dict]:
+        results = []
+        product_ids = {item.product_id for _, sale in chunk for item in sale.items}
+        
+        known_result = await self.db.execute(select(Product.id).filter(Product.id.in_(list(product_ids))))
+        known_ids = set(known_result.scalars().all())
+        
+        valid = []
+        
+        for index, sale in chunk:
+            missing = sorted({item.product_id for item in sale.items} - known_ids)
+            
+            if missing:
+                results.append({
+                    "index": index,
+                    "status": "error",
+                    "error": f"Products not found: {', '.join(str(product_id) for product_id in missing)}"
+                })
+            else:
+                valid.append((index, sale))
+        
+        if not valid:
+            return results
+        
+        try:
+            created = await self.insert_sales([sale for _, sale in valid])
+            await self.db.commit()
+            await analytics_cache.invalidate_timestamps([created_at for _, _, created_at in created])
+        except DBAPIError as e:
+            await self.db.rollback()
+            return results + [
+                {"index": index, "status": "error", "error": str(e.orig)}
+                for index, _ in valid
+            ]
+        
+        sales_ingested_total.inc("bulk", amount=len(created))
+        sale_items_ingested_total.inc("bulk", amount=sum(len(sale.items) for _, sale in valid))
+        
+        return results + [
+            {
+                "index": index,
+                "status": "created",
+                "sale_id": sale_id,
+                "reference_number": reference_number
+            }
+            for (index, _), (sale_id, reference_number, _) in zip(valid, created)
+        ]
+
+    async def insert_sales(self, sales: List[SaleCreate]) -> List[Tuple[int, str, datetime]]:
+        """
+        Insert sale headers, items and inventory changes with multi-row inserts,
+        decrement inventory, update the rollups and notify the sale items,
+        without committing.
+
+        Returns (sale id, reference number, created at) for each of ``sales``, in order.
+        """
+        # The full 128-bit uuid: truncated ones collide on a large sales table
+        # and a single collision fails a whole bulk chunk
+        references = [f"SALE-{uuid.uuid4().hex.upper()}" for _ in sales]
+        
+        result = await self.db.execute(
+            insert(Sale).returning(Sale.id, Sale.reference_number, Sale.created_at),
+            [
+                {"reference_number": reference, **sale.dict(exclude={"items"})}
+                for reference, sale in zip(references, sales)
+            ]
+        )
+        created = {row.reference_number: row for row in result}
+        sale_ids = {reference: row.id for reference, row in created.items()}
+        
+        items = [
+            (reference, item)
+            for reference, sale in zip(references, sales)
+            for item in sale.items
+        ]
+        
+        if items:
+            await self.db.execute(
+                insert(SaleItem),
+                [
+                    {"sale_id": sale_ids[reference], **item.dict()}
+                    for reference, item in items
+                ]
+            )
+            
+            inventory_ids = await self.decrement_inventory([item for _, item in items])
+            
+            changes = [
+                {
+                    "inventory_id": inventory_ids[item.product_id],
+                    "quantity_change": -item.quantity,
+                    "reason": f"Sale: {reference}"
+                }
+                for reference, item in items
+                if item.product_id in inventory_ids
+            ]
+            
+            if changes:
+                await self.db.execute(insert(InventoryChange), changes)
+        
+        await RollupService(self.db).apply_sales(list(sale_ids.values()))
+        # Every worker's product sketches pick the items up once committed
+        await notify_sale_items(self.db, [
+            (created[reference].created_at, sale.items)
+            for reference, sale in zip(references, sales)
+        ])
+        
+        return [
+            (created[reference].id, reference, created[reference].created_at)
+            for reference in references
+        ]
+
+    async def decrement_inventory(self, items) -> dict:
+        """
+        Atomically subtract the sold quantities from inventory in one
+        UPDATE ... FROM (VALUES ...) statement.
+
+        Returns a mapping of product id to inventory id for the rows updated.
+        Rows crossing or below their low-stock threshold are notified.
+        """
+        quantities = defaultdict(int)
+        
+        for item in items:
+            quantities[item.product_id] += item.quantity
+        
+        decrements = values(
+            column("product_id", Integer),
+            column("quantity", Integer),
+            name="decrements"
+        ).data(sorted(quantities.items()))
+        
+        result = await self.db.execute(
+            update(Inventory)
+            .where(Inventory.product_id == decrements.c.product_id)
+            .values(quantity=Inventory.quantity - decrements.c.quantity)
+            .returning(Inventory.id, Inventory.product_id, Inventory.quantity, Inventory.low_stock_threshold)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        
+        await notify_changes(self.db, [
+            (row.product_id, row.quantity + quantities[row.product_id], row.quantity, row.low_stock_threshold, None)
+            for row in rows
+        ])
+        
+        return {row.product_id: row.id for row in rows}
+
+    @staticmethod
+    def item_filter(product_id: Optional[int] = None, category_id: Optional[int] = None):
+        """
+        EXISTS semi-join restricting a Sale query to sales containing an item
+        of the given product and/or category, evaluated entirely in the database.
+        """
+        query = select(SaleItem.id).filter(SaleItem.sale_id == Sale.id)
+        
+        if product_id:
+            query = query.filter(SaleItem.product_id == product_id)
+        
+        if category_id:
+            query = query.join(Product, SaleItem.product_id == Product.id).filter(
+                Product.category_id == category_id
+            )
+        
+        return query.exists()
+
+    @staticmethod
+    def sale_filters(filter_params: SaleFilter):
+        """
+        Filter expression for a Sale query matching a SaleFilter, or None
+        when the filter is empty.
+        """
+        filters = []
+        
+        if filter_params.start_date:
+            filters.append(Sale.created_at >= filter_params.start_date)
+        
+        if filter_params.end_date:
+            filters.append(Sale.created_at <= filter_params.end_date)
+        
+        if filter_params.min_amount is not None:
+            filters.append(Sale.total_amount >= filter_params.min_amount)
+        
+        if filter_params.max_amount is not None:
+            filters.append(Sale.total_amount <= filter_params.max_amount)
+        
+        if filter_params.product_id or filter_params.category_id:
+            filters.append(SaleService.item_filter(filter_params.product_id, filter_params.category_id))
+        
+        return and_(*filters) if filters else None
+
+    @staticmethod
+    def with_items(query):
+        """
+        Attach eager loading of sale items and their product names to a Sale query.
+
+        Loading a page costs two statements regardless of its size: one for the
+        sales and one for all of their items joined to products.
+        """
+        return query.options(
+            selectinload(Sale.items)
+            .joinedload(SaleItem.product)
+            .load_only(Product.id, Product.name)
+        )
+
+    async def load_sales(self, query) -> List[dict]:
+        result = await self.db.execute(self.with_items(query))
+        sales = result.scalars().all()
+
+        return [self.serialize_sale(sale) for sale in sales]
+
+    async def get_sale(self, sale_id: int) -> Optional[dict]:
+        sales = await self.load_sales(select(Sale).filter(Sale.id == sale_id))
+
+        return sales[0] if sales else None
+
+    @staticmethod
+    def serialize_sale(sale: Sale) -> dict:
+        return {
+            "id": sale.id,
+            "reference_number": sale.reference_number,
+            "total_amount": sale.total_amount,
+            "tax_amount": sale.tax_amount,
+            "discount_amount": sale.discount_amount,
+            "payment_method": sale.payment_method,
+            "customer_name": sale.customer_name,
+            "customer_email": sale.customer_email,
+            "notes": sale.notes,
+            "created_at": sale.created_at,
+            "items": [
+                {
+                    "id": item.id,
+                    "sale_id": item.sale_id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "price": item.price,
+                    "discount": item.discount,
+                    "total": item.total,
+                    "product_name": item.product.name if item.product else None
+                }
+                for item in sale.items
+            ]
+        }
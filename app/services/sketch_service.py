@@ -0,0 +1,76 @@
+from typing import Optional, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import Text, cast, func
+
+from app.models.sale import Sale, SaleItem
+from app.sketches import ProductSketches
+
+# Sale items streamed per round trip while rebuilding
+REBUILD_BATCH_SIZE = 10000
+
+class SketchService:
+    """
+    Builds the per-day product sketches from the sales tables, for backfills
+    and for processes starting without a saved sketch file.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def default_start(sketches: ProductSketches) -> date:
+        return datetime.now(timezone.utc).date() - timedelta(days=sketches.retention_days)
+
+    async def rebuild(self, sketches: ProductSketches, start_day: Optional[date] = None) -> int:
+        """
+        Rebuild the days from ``start_day`` on (the retention window by
+        default) from the sale items and merge them into ``sketches``.
+        Returns the number of items read.
+        """
+        if start_day is None:
+            start_day = self.default_start(sketches)
+
+        rebuilt, _, items = await self.build(sketches, start_day)
+        sketches.merge(rebuilt, start_day)
+
+        return items
+
+    async def build(self, sketches: ProductSketches, start_day: date) -> Tuple[ProductSketches, str, int]:
+        """
+        Sketches shaped like ``sketches`` of the sale items since ``start_day``,
+        the snapshot they were read in (``txid_current_snapshot`` text, telling
+        which transactions they include) and the number of items read
+        """
+        # One snapshot for the snapshot query and the stream
+        await self.db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        snapshot = (await self.db.execute(select(cast(func.txid_current_snapshot(), Text)))).scalar_one()
+
+        # UTC days, matching sale_day() on the write path
+        day = func.date(func.timezone("UTC", Sale.created_at))
+
+        query = select(
+            day.label("day"),
+            SaleItem.product_id,
+            SaleItem.quantity,
+            SaleItem.total
+        ).join(
+            Sale, SaleItem.sale_id == Sale.id
+        ).filter(
+            Sale.created_at >= datetime.combine(start_day, time.min, tzinfo=timezone.utc)
+        ).execution_options(
+            yield_per=REBUILD_BATCH_SIZE
+        )
+
+        rebuilt = ProductSketches(sketches.width, sketches.depth, sketches.capacity, sketches.retention_days)
+        items = 0
+        result = await self.db.stream(query)
+
+        async for batch in result.partitions():
+            for row in batch:
+                rebuilt.add_item(row.day, row.product_id, row.quantity, row.total)
+
+            items += len(batch)
+
+        return rebuilt, snapshot, items
@@ -0,0 +1,145 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import JSON, String, Text, cast, column, func, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.listener import ChannelListener
+from app.services.sketch_service import SketchService
+from app.sketches import ProductSketches, product_sketches, sale_day
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY channel carrying the items of committed sales
+CHANNEL = "sale_items"
+
+# Products per notification, keeping payloads well under PostgreSQL's 8000 bytes
+NOTIFY_BATCH_SIZE = 150
+
+async def notify_sale_items(db: AsyncSession, sales: Iterable[Tuple[datetime, list]]):
+    """
+    Queue NOTIFYs with the quantity and revenue per product and UTC day of
+    ``sales`` ((created at, items) pairs), tagged with the transaction id.
+    Like the low-stock notifications they are only delivered on commit. Costs
+    one statement. PostgreSQL folds identical notifications of a transaction,
+    so call it once per transaction.
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+
+    for created_at, items in sales:
+        day = sale_day(created_at)
+
+        for item in items:
+            total = totals[day, item.product_id]
+            total[0] += item.quantity
+            total[1] += float(item.total)
+
+    by_day = defaultdict(list)
+
+    for (day, product_id), (quantity, revenue) in totals.items():
+        by_day[day].append([product_id, quantity, revenue])
+
+    batches = [
+        (day.isoformat(), json.dumps(items[start:start + NOTIFY_BATCH_SIZE]))
+        for day, items in sorted(by_day.items())
+        for start in range(0, len(items), NOTIFY_BATCH_SIZE)
+    ]
+
+    if not batches:
+        return
+
+    payloads = values(
+        column("day", String),
+        column("items", Text),
+        name="payloads"
+    ).data(batches)
+
+    payload = func.json_build_object(
+        "xid", func.txid_current(),
+        "day", payloads.c.day,
+        "items", cast(payloads.c.items, JSON)
+    )
+
+    await db.execute(select(func.pg_notify(CHANNEL, cast(payload, Text))).select_from(payloads))
+
+def committed_in(snapshot: str, xid: int) -> bool:
+    """
+    Whether transaction ``xid`` is visible in ``snapshot``, the text form
+    (xmin:xmax:xip,...) of ``txid_current_snapshot()``
+    """
+    xmin, xmax, in_progress = snapshot.split(":")
+
+    if xid < int(xmin):
+        return True
+
+    return xid < int(xmax) and str(xid) not in in_progress.split(",")
+
+class SketchFeed(ChannelListener):
+    """
+    Keeps ``sketches`` current from the sale items every committed sale
+    notifies, so each worker process sees every worker's sales.
+
+    Loading rebuilds the retention window from the database, or on a first
+    start with sketches restored from a file, only the days since the file
+    was saved. Notifications buffered during a rebuild are applied on top of
+    it, except those of transactions the rebuild already read.
+    """
+
+    channel = CHANNEL
+
+    def __init__(self, sketches: ProductSketches):
+        super().__init__()
+        self.sketches = sketches
+        # Whether the sketches were ever loaded, so are worth saving
+        self.loaded = False
+        self._start_day: Optional[date] = None
+
+    async def start(self, engine, session_factory, start_day: Optional[date] = None):
+        """
+        ``start_day`` limits the first rebuild to the days from then on
+        """
+        self._start_day = start_day
+        await super().start(engine, session_factory)
+
+    async def load(self):
+        start_day = SketchService.default_start(self.sketches)
+
+        if self._start_day is not None:
+            # Only the first load; reconnects rebuild the whole retention window
+            start_day = max(start_day, self._start_day)
+            self._start_day = None
+
+        async with self._session_factory() as db:
+            rebuilt, snapshot, items = await SketchService(db).build(self.sketches, start_day)
+
+        logger.info("Rebuilt product sketches from %d sale items", items)
+
+        return start_day, rebuilt, snapshot
+
+    def install(self, state, pending: List[str]):
+        start_day, rebuilt, snapshot = state
+        self.sketches.merge(rebuilt, start_day)
+        self.loaded = True
+
+        for payload in pending:
+            self.receive(payload, snapshot)
+
+    def receive(self, payload: str, snapshot: Optional[str] = None):
+        try:
+            event = json.loads(payload)
+
+            if snapshot is not None and committed_in(snapshot, event["xid"]):
+                return
+
+            day = date.fromisoformat(event["day"])
+
+            for product_id, quantity, revenue in event["items"]:
+                self.sketches.add_item(day, product_id, quantity, revenue)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed sale items notification: %s", payload)
+
+sketch_feed = SketchFeed(product_sketches)
@@ -0,0 +1,288 @@
+import base64
+import fcntl
+import json
+import math
+import os
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+# Mersenne prime for the pairwise independent hash family
+_PRIME = (1 << 61) - 1
+
+class CountMinSketch:
+    """
+    Count-Min sketch of non-negative weights keyed by integer.
+
+    Estimates never undercount. With ``width`` w and ``depth`` d, an estimate
+    exceeds the true value by more than e/w times the total weight with
+    probability at most e^-d.
+    """
+
+    def __init__(self, width: int, depth: int, counters: Optional[array] = None):
+        if depth > len(_HASH_SEEDS):
+            raise ValueError(f"Count-Min depth is limited to {len(_HASH_SEEDS)}")
+
+        self.width = width
+        self.depth = depth
+        self.counters = counters if counters is not None else array("d", [0.0]) * (width * depth)
+        self.total = 0.0
+
+    def _cells(self, key: int):
+        for row in range(self.depth):
+            a, b = _HASH_SEEDS[row]
+            yield row * self.width + ((a * key + b) % _PRIME) % self.width
+
+    def add(self, key: int, amount: float):
+        for cell in self._cells(key):
+            self.counters[cell] += amount
+
+        self.total += amount
+
+    def estimate(self, key: int) -> float:
+        return min(self.counters[cell] for cell in self._cells(key))
+
+    def error_bound(self) -> float:
+        return math.e / self.width * self.total
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "counters": base64.b64encode(self.counters.tobytes()).decode()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CountMinSketch":
+        counters = array("d")
+        counters.frombytes(base64.b64decode(data["counters"]))
+        sketch = cls(data["width"], data["depth"], counters)
+        sketch.total = data["total"]
+
+        return sketch
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters: keeps at most ``capacity`` keys, and any key
+    whose weight exceeds total/capacity is guaranteed to be among them.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[int, float] = {}
+
+    def add(self, key: int, amount: float):
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = self.counts.get(key, 0.0) + amount
+            return
+
+        # Replace the smallest key, inheriting its count as potential error
+        smallest = min(self.counts, key=self.counts.get)
+        self.counts[key] = self.counts.pop(smallest) + amount
+
+    def keys(self) -> Iterable[int]:
+        return self.counts.keys()
+
+class DailyProductSketch:
+    """
+    One day of product sales: revenue and quantity Count-Min sketches plus
+    Space-Saving candidates for the top products by revenue.
+    """
+
+    def __init__(self, width: int, depth: int, capacity: int):
+        self.revenue = CountMinSketch(width, depth)
+        self.quantity = CountMinSketch(width, depth)
+        self.heavy_hitters = SpaceSaving(capacity)
+
+    def add(self, product_id: int, quantity: int, revenue: float):
+        self.revenue.add(product_id, revenue)
+        self.quantity.add(product_id, quantity)
+        self.heavy_hitters.add(product_id, revenue)
+
+    def to_dict(self) -> dict:
+        return {
+            "revenue": self.revenue.to_dict(),
+            "quantity": self.quantity.to_dict(),
+            "capacity": self.heavy_hitters.capacity,
+            "heavy_hitters": list(self.heavy_hitters.counts.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DailyProductSketch":
+        sketch = cls.__new__(cls)
+        sketch.revenue = CountMinSketch.from_dict(data["revenue"])
+        sketch.quantity = CountMinSketch.from_dict(data["quantity"])
+        sketch.heavy_hitters = SpaceSaving(data["capacity"])
+        sketch.heavy_hitters.counts = {int(key): count for key, count in data["heavy_hitters"]}
+
+        return sketch
+
+class ProductSketches:
+    """
+    Per-day product revenue sketches kept in process, fed by sale writes.
+
+    Days are UTC calendar days and windows resolve to whole days. Memory is
+    bounded by ``retention_days`` sketches of fixed size, independent of the
+    number of sales. Each worker process keeps its own copy, maintained from
+    the sale items every write notifies (see app.sketch_feed); persist them
+    with ``save``/``load`` or rebuild them from the database.
+    """
+
+    def __init__(self, width: int = 1024, depth: int = 4, capacity: int = 128, retention_days: int = 400):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.retention_days = retention_days
+        self.days: Dict[date, DailyProductSketch] = {}
+
+    def add_item(self, day: date, product_id: int, quantity: int, revenue: float):
+        sketch = self.days.get(day)
+
+        if sketch is None:
+            sketch = self.days[day] = DailyProductSketch(self.width, self.depth, self.capacity)
+            self._prune()
+
+        sketch.add(product_id, quantity, revenue)
+
+    def candidates(self, start_day: date, end_day: date) -> set:
+        """
+        Products that may be in the top by revenue of the window
+        """
+        keys = set()
+
+        for sketch in self._window(start_day, end_day):
+            keys.update(sketch.heavy_hitters.keys())
+
+        return keys
+
+    def estimate(self, product_ids: Iterable[int], start_day: date, end_day: date) -> List[Tuple[int, float, float]]:
+        """
+        (product_id, revenue, quantity) estimates summed over the window's days
+        """
+        sketches = list(self._window(start_day, end_day))
+
+        return [
+            (
+                product_id,
+                sum(sketch.revenue.estimate(product_id) for sketch in sketches),
+                sum(sketch.quantity.estimate(product_id) for sketch in sketches)
+            )
+            for product_id in product_ids
+        ]
+
+    def error_bound(self, start_day: date, end_day: date) -> float:
+        """
+        Revenue any estimate of the window may overcount by, with probability
+        at least 1 - e^-depth per estimate
+        """
+        return sum(sketch.revenue.error_bound() for sketch in self._window(start_day, end_day))
+
+    def merge(self, rebuilt: "ProductSketches", start_day: date):
+        """
+        Take the days from ``start_day`` on from ``rebuilt`` and keep the
+        earlier ones, which the rebuild did not cover
+        """
+        for day in [day for day in self.days if day >= start_day]:
+            del self.days[day]
+
+        self.days.update(rebuilt.days)
+
+        if self.days:
+            self._prune()
+
+    def clear(self):
+        self.days.clear()
+
+    def save(self, path: str) -> bool:
+        """
+        Write the sketches to ``path``, replacing it atomically. All workers
+        save to the same file, so one writes at a time: returns False without
+        writing while another process holds the file's lock.
+        """
+        data = {
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "width": self.width,
+            "depth": self.depth,
+            "capacity": self.capacity,
+            "days": {day.isoformat(): sketch.to_dict() for day, sketch in self.days.items()}
+        }
+
+        with open(path + ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+
+            with open(path + ".tmp", "w") as f:
+                json.dump(data, f)
+
+            os.replace(path + ".tmp", path)
+
+        return True
+
+    def load(self, path: str) -> Optional[datetime]:
+        """
+        Restore the sketches saved to ``path``. Returns when they were saved
+        (None for files predating that), since sales committed later are
+        missing from them.
+        """
+        with open(path) as f:
+            data = json.load(f)
+
+        if (data["width"], data["depth"]) != (self.width, self.depth):
+            raise ValueError(f"Sketch file {path} was built with a different width/depth")
+
+        self.days = {
+            date.fromisoformat(day): DailyProductSketch.from_dict(sketch)
+            for day, sketch in data["days"].items()
+        }
+
+        return datetime.fromisoformat(data["saved_at"]) if "saved_at" in data else None
+
+    def stats(self) -> dict:
+        return {
+            "days": len(self.days),
+            "width": self.width,
+            "depth": self.depth,
+            "capacity": self.capacity,
+            "bytes": len(self.days) * 2 * self.width * self.depth * 8
+        }
+
+    def _window(self, start_day: date, end_day: date):
+        return (sketch for day, sketch in self.days.items() if start_day <= day <= end_day)
+
+    def _prune(self):
+        oldest = max(self.days) - timedelta(days=self.retention_days)
+
+        for day in [day for day in self.days if day < oldest]:
+            del self.days[day]
+
+def sale_day(created_at: datetime) -> date:
+    if created_at.tzinfo:
+        created_at = created_at.astimezone(timezone.utc)
+
+    return created_at.date()
+
+def _hash_seeds(depth: int):
+    # Fixed seeds keep hashing stable across processes and saved files
+    seeds, state = [], 0x9E3779B97F4A7C15
+
+    for _ in range(depth):
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        a = state % (_PRIME - 1) + 1
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        seeds.append((a, state % _PRIME))
+
+    return seeds
+
+_HASH_SEEDS = _hash_seeds(16)
+
+product_sketches = ProductSketches(
+    width=settings.sketch_width,
+    depth=settings.sketch_depth,
+    capacity=settings.sketch_top_k,
+    retention_days=settings.sketch_retention_days
+)
@@ -0,0 +1,93 @@
+"""
+Benchmark of the analytics query backends.
+
+Runs every AnalyticsService query against each registered backend on the
+same database and window, reporting the median latency and whether the
+result matches the raw-table backend.
+
+    python benchmarks/analytics_backends.py --days 90 --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import async_session, engine
+from app.schemas.analytics import TimeFrame, ComparisonRequest, Period
+from app.services.analytics_backends import BACKENDS, create_backend
+from app.services.analytics_service import AnalyticsService
+
+def scenarios(days: int):
+    # Whole-day windows, so rollup and raw backends cover the same sales
+    end = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(microseconds=1)
+    start = end - timedelta(days=days) + timedelta(microseconds=1)
+    half = start + (end - start) / 2
+
+    return {
+        "revenue daily": lambda service: service.get_revenue(start, end, TimeFrame.DAILY),
+        "revenue monthly": lambda service: service.get_revenue(start, end, TimeFrame.MONTHLY),
+        "compare periods": lambda service: service.compare_periods(ComparisonRequest(
+            first_period_start=start,
+            first_period_end=datetime.combine(half.date(), datetime.min.time()) - timedelta(microseconds=1),
+            second_period_start=datetime.combine(half.date(), datetime.min.time()),
+            second_period_end=end
+        )),
+        "compare 12 periods": lambda service: service.compare_periods(ComparisonRequest(periods=[
+            Period(start_date=start + (end - start) * index / 12, end_date=start + (end - start) * (index + 1) / 12)
+            for index in range(12)
+        ])),
+        "category revenue": lambda service: service.get_category_revenue(start, end),
+        "product revenue": lambda service: service.get_product_revenue(start, end),
+        "low performers": lambda service: service.get_low_performing_products(start, end),
+    }
+
+async def measure(backend_name, scenario, repeat):
+    timings = []
+    result = None
+
+    for _ in range(repeat):
+        async with async_session() as session:
+            service = AnalyticsService(session, create_backend(session, backend_name))
+            started = time.perf_counter()
+            result = await scenario(service)
+            timings.append(time.perf_counter() - started)
+
+    return sorted(timings)[len(timings) // 2], result
+
+async def main(days: int, repeat: int):
+    print(f"{'query':<20}" + "".join(f"{name + ' ms':>14}" for name in BACKENDS) + "  matches raw")
+
+    for label, scenario in scenarios(days).items():
+        timings = []
+        results = {}
+
+        for name in BACKENDS:
+            elapsed, results[name] = await measure(name, scenario, repeat)
+            timings.append(elapsed)
+
+        matches = all(_rounded(result) == _rounded(results["raw"]) for result in results.values())
+        print(f"{label:<20}" + "".join(f"{elapsed * 1000:>14.1f}" for elapsed in timings) + f"  {matches}")
+
+    await engine.dispose()
+
+def _rounded(value):
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {key: _rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rounded(item) for item in value]
+    return value
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.days, args.repeat))
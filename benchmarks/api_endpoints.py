@@ -0,0 +1,238 @@
+"""
+End-to-end benchmark of the API's hot endpoints with regression checks.
+
+Boots the app in-process (startup hooks included) and drives each endpoint in
+turn with concurrent httpx clients, recording p50/p95/p99 latency, throughput,
+errors and the database statements issued per request. Results are written as
+JSON; given a baseline file, the run fails when any endpoint regressed by more
+than the threshold. --scale first regenerates the database with the synthetic
+data generator, which replaces its contents (create_sale also inserts sales),
+so run it against a scratch database:
+
+    python benchmarks/api_endpoints.py --scale small --output baseline.json
+    python benchmarks/api_endpoints.py --baseline baseline.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Arguments of app/generate_data.py per dataset size
+SCALES = {
+    "small": ["--products", "1000", "--days", "90", "--sales-per-day", "200"],
+    "medium": ["--products", "5000", "--days", "365", "--sales-per-day", "2000"],
+    "large": ["--products", "20000", "--days", "730", "--sales-per-day", "10000"],
+}
+
+ENDPOINTS = {
+    "get_sales": ("GET", "/api/sales/?limit=20"),
+    "create_sale": ("POST", "/api/sales/"),
+    "revenue": ("GET", "/api/analytics/revenue"),
+    "low_stock": ("GET", "/api/inventory/low-stock"),
+}
+
+# Metrics compared against the baseline, and whether higher is worse
+REGRESSION_METRICS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "throughput_rps": False,
+    "statements_per_request": True,
+}
+
+def count_statements(*engines):
+    """
+    Attribute statements to the current QueryStats, unless the app already
+    does (QUERY_STATS_ENABLED)
+    """
+    from app.config import settings
+    from app.instrumentation import instrument_engine
+
+    if settings.query_stats_enabled:
+        return
+
+    for engine in set(engines):
+        instrument_engine(engine)
+
+def percentile(ordered, p):
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def generate(scale: str, seed: int):
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "app", "generate_data.py"), *SCALES[scale], "--seed", str(seed)],
+        check=True
+    )
+
+async def sale_payloads(client):
+    response = await client.get("/api/products/?limit=50")
+    response.raise_for_status()
+    products = response.json()
+
+    if not products:
+        raise RuntimeError("create_sale needs products, seed the database first (--scale)")
+
+    def payload(index):
+        product = products[index % len(products)]
+
+        return {
+            "total_amount": product["price"],
+            "payment_method": "cash",
+            "notes": "Benchmark sale",
+            "items": [{
+                "product_id": product["id"],
+                "quantity": 1,
+                "price": product["price"],
+                "total": product["price"]
+            }]
+        }
+
+    return payload
+
+async def measure(client, method, path, payload, requests: int, concurrency: int, warmup: int) -> dict:
+    from app.instrumentation import QueryStats, current_query_stats
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statements = []
+    errors = 0
+
+    async def one(index):
+        nonlocal errors
+        async with semaphore:
+            # Each request runs in its own task, so gets its own stats
+            stats = QueryStats()
+            current_query_stats.set(stats)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=payload(index) if payload else None)
+            latencies.append(time.perf_counter() - started)
+            statements.append(stats.count)
+            errors += response.status_code >= 400
+
+    for index in range(warmup):
+        await client.request(method, path, json=payload(index) if payload else None)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": requests / elapsed,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "statements_per_request": sum(statements) / len(statements),
+    }
+
+async def run(endpoints, requests: int, concurrency: int, warmup: int) -> dict:
+    import httpx
+    from app.database import engine, read_engine
+    from app.main import app, background_tasks
+
+    count_statements(engine, read_engine)
+    await app.router.startup()
+    # Let the startup rebuilds finish so they do not compete with the load
+    await asyncio.gather(*background_tasks)
+
+    results = {}
+
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+            for name in endpoints:
+                method, path = ENDPOINTS[name]
+                payload = await sale_payloads(client) if method == "POST" else None
+                results[name] = await measure(client, method, path, payload, requests, concurrency, warmup)
+                print(
+                    f"{name:<14}{results[name]['p50_ms']:>10.1f}{results[name]['p95_ms']:>10.1f}"
+                    f"{results[name]['p99_ms']:>10.1f}{results[name]['throughput_rps']:>10.1f}"
+                    f"{results[name]['statements_per_request']:>8.1f}{results[name]['errors']:>8}"
+                )
+    finally:
+        await app.router.shutdown()
+        await engine.dispose()
+
+        if read_engine is not engine:
+            await read_engine.dispose()
+
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Print the change of every metric against the baseline and return the
+    regressions beyond the threshold
+    """
+    regressions = []
+
+    for name, current in results.items():
+        previous = baseline["endpoints"].get(name)
+
+        if not previous:
+            continue
+
+        for metric, higher_is_worse in REGRESSION_METRICS.items():
+            before, after = previous[metric], current[metric]
+
+            if not before:
+                continue
+
+            change = (after - before) / before
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            print(f"{name:<14}{metric:<24}{before:>10.2f}{after:>10.2f}{change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+
+            if regressed:
+                regressions.append((name, metric, change))
+
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scale", choices=list(SCALES), help="Regenerate the database at this size first")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression per metric")
+    args = parser.parse_args()
+
+    if args.scale:
+        generate(args.scale, args.seed)
+
+    print(f"{'endpoint':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'stmts':>8}{'errors':>8}")
+    results = asyncio.run(run(args.endpoints, args.requests, args.concurrency, args.warmup))
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "scale": args.scale,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "endpoints": results
+        }, f, indent=2)
+
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
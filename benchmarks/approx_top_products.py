@@ -0,0 +1,97 @@
+"""
+Accuracy and latency of the sketch-backed product rankings (mode=approx)
+against the exact GROUP BY queries.
+
+Builds the product sketches from the database first, then for each window
+compares top and bottom products: median latency of both modes, how many of
+the exact top-N the approximation returns, the largest revenue error among
+them and the error bound reported to clients. Seed a large dataset first.
+
+    python benchmarks/approx_top_products.py --windows 7 30 90 --limit 10 --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import async_session, engine
+from app.services.analytics_backends import create_backend
+from app.services.analytics_service import AnalyticsService
+from app.services.sketch_service import SketchService
+from app.sketches import ProductSketches
+
+async def measure(sketches, backend_name, query, repeat):
+    timings = []
+    result = None
+
+    for _ in range(repeat):
+        async with async_session() as session:
+            service = AnalyticsService(session, create_backend(session, backend_name), sketches=sketches)
+            started = time.perf_counter()
+            result = await query(service)
+            timings.append(time.perf_counter() - started)
+
+    return sorted(timings)[len(timings) // 2], result
+
+def accuracy(exact, approx):
+    exact_revenue = {row["product_id"]: row["revenue"] for row in exact}
+    found = [row for row in approx if row["product_id"] in exact_revenue]
+    errors = [
+        abs(row["revenue"] - exact_revenue[row["product_id"]]) / exact_revenue[row["product_id"]]
+        for row in found if exact_revenue[row["product_id"]]
+    ]
+
+    return len(found), max(errors, default=0.0)
+
+async def main(windows, limit: int, repeat: int, backend: str):
+    sketches = ProductSketches(
+        settings.sketch_width, settings.sketch_depth, settings.sketch_top_k, settings.sketch_retention_days
+    )
+
+    async with async_session() as session:
+        started = time.perf_counter()
+        items = await SketchService(session).rebuild(sketches)
+        print(f"built sketches from {items} items in {time.perf_counter() - started:.1f}s, {sketches.stats()}")
+
+    # Whole UTC days, the granularity of the sketches
+    end = datetime.combine(datetime.now(timezone.utc).date(), datetime.min.time(), tzinfo=timezone.utc) - timedelta(microseconds=1)
+
+    print(f"{'query':<22}{'days':>6}{'exact ms':>10}{'approx ms':>11}{'recall':>9}{'max err':>9}{'bound':>14}")
+
+    for days in windows:
+        start = end - timedelta(days=days) + timedelta(microseconds=1)
+        queries = {
+            "top products": lambda service, approx: service.get_product_revenue(start, end, None, limit, approx),
+            "low performers": lambda service, approx: service.get_low_performing_products(start, end, limit, approx),
+        }
+
+        for label, query in queries.items():
+            exact_time, exact = await measure(sketches, backend, lambda service: query(service, False), repeat)
+            approx_time, approx = await measure(sketches, backend, lambda service: query(service, True), repeat)
+            found, max_error = accuracy(exact, approx)
+
+            async with async_session() as session:
+                bound = AnalyticsService(session, sketches=sketches).approx_error_bound(start, end)
+
+            print(
+                f"{label:<22}{days:>6}{exact_time * 1000:>10.1f}{approx_time * 1000:>11.1f}"
+                f"{found:>6}/{len(exact):<2}{max_error:>9.2%}{bound:>14.2f}"
+            )
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30, 90])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", default="raw", help="Backend of the exact queries")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.windows, args.limit, args.repeat, args.backend))
@@ -0,0 +1,89 @@
+"""
+Load test for engine and pool configuration.
+
+Drives the app in-process with concurrent httpx clients against a few read
+endpoints, once per configuration. Each configuration is a set of
+environment overrides and runs in its own subprocess, because the engine is
+built at import time:
+
+    python benchmarks/engine_load.py --requests 2000 --concurrency 50 \\
+        "DATABASE_ECHO=true" "DATABASE_ECHO=false" \\
+        "DATABASE_ECHO=false DATABASE_POOL_SIZE=30 DATABASE_STATEMENT_CACHE_SIZE=0"
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PATHS = [
+    "/api/sales/?limit=20",
+    "/api/products/?limit=50",
+    "/api/inventory/low-stock",
+    "/api/analytics/revenue",
+]
+
+async def drive(requests: int, concurrency: int) -> dict:
+    import httpx
+    from app.database import engine, pool_metrics
+    from app.main import app
+
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        async def one(index):
+            nonlocal errors
+            async with semaphore:
+                response = await client.get(PATHS[index % len(PATHS)])
+                errors += response.status_code >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    metrics = pool_metrics()["primary"]
+    await engine.dispose()
+
+    return {
+        "requests_per_second": requests / elapsed,
+        "errors": errors,
+        "pool_wait_avg_ms": metrics["wait_time_avg"] * 1000,
+        "pool_wait_max_ms": metrics["wait_time_max"] * 1000,
+    }
+
+def run_configuration(configuration: str, requests: int, concurrency: int) -> dict:
+    env = dict(os.environ)
+    env.update(item.split("=", 1) for item in configuration.split())
+
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", "--requests", str(requests), "--concurrency", str(concurrency)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("configurations", nargs="*", default=["DATABASE_ECHO=true", "DATABASE_ECHO=false"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(drive(args.requests, args.concurrency))))
+        sys.exit(0)
+
+    for configuration in args.configurations:
+        result = run_configuration(configuration, args.requests, args.concurrency)
+        print(
+            f"{configuration:<70} {result['requests_per_second']:>8.1f} req/s  "
+            f"errors {result['errors']:<4} pool wait avg {result['pool_wait_avg_ms']:.2f} ms "
+            f"max {result['pool_wait_max_ms']:.2f} ms"
+        )
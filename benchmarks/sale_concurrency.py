@@ -0,0 +1,134 @@
+"""
+Concurrency benchmark for sale creation.
+
+Fires concurrent single-item sales at one product and checks that the
+inventory decrement matches the quantity sold (no lost updates), comparing
+the transactional SaleService path with the previous per-item
+read-modify-write implementation.
+
+Run against a scratch database (it inserts sales):
+
+    python benchmarks/sale_concurrency.py --sales 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+import uuid
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.future import select
+
+from app.database import async_session, engine
+from app.models.category import Category
+from app.models.product import Product
+from app.models.inventory import Inventory, InventoryChange
+from app.models.sale import Sale, SaleItem, PaymentMethod
+from app.schemas.sale import SaleCreate, SaleItemCreate
+from app.services.sale_service import SaleService
+
+async def legacy_create_sale(db, sale: SaleCreate):
+    """
+    The pre-transactional implementation: header commit, then a SELECT and a
+    Python-side decrement per item, then a second commit.
+    """
+    reference_number = f"SALE-{uuid.uuid4().hex[:8].upper()}"
+    db_sale = Sale(
+        reference_number=reference_number,
+        total_amount=sale.total_amount,
+        payment_method=sale.payment_method
+    )
+    db.add(db_sale)
+    await db.commit()
+    await db.refresh(db_sale)
+
+    for item in sale.items:
+        db.add(SaleItem(sale_id=db_sale.id, **item.dict()))
+
+        result = await db.execute(select(Inventory).filter(Inventory.product_id == item.product_id))
+        inventory = result.scalars().first()
+
+        if inventory:
+            db.add(InventoryChange(
+                inventory_id=inventory.id,
+                quantity_change=-item.quantity,
+                reason=f"Sale: {reference_number}"
+            ))
+            inventory.quantity -= item.quantity
+
+    await db.commit()
+
+async def transactional_create_sale(db, sale: SaleCreate):
+    await SaleService(db).create_sale(sale)
+
+async def create_fixture(initial_quantity: int) -> int:
+    suffix = uuid.uuid4().hex[:8].upper()
+
+    async with async_session() as session:
+        category = Category(name=f"Benchmark {suffix}")
+        session.add(category)
+        await session.flush()
+
+        product = Product(
+            sku=f"BENCH-{suffix}",
+            name=f"Benchmark product {suffix}",
+            price=1.0,
+            cost=0.5,
+            category_id=category.id
+        )
+        session.add(product)
+        await session.flush()
+
+        session.add(Inventory(product_id=product.id, quantity=initial_quantity))
+        await session.commit()
+
+        return product.id
+
+async def current_quantity(product_id: int) -> int:
+    async with async_session() as session:
+        result = await session.execute(
+            select(Inventory.quantity).filter(Inventory.product_id == product_id)
+        )
+        return result.scalar_one()
+
+async def run(name, create, sales: int, concurrency: int):
+    initial_quantity = sales * 10
+    product_id = await create_fixture(initial_quantity)
+    payload = SaleCreate(
+        total_amount=1.0,
+        payment_method=PaymentMethod.CASH,
+        items=[SaleItemCreate(product_id=product_id, quantity=1, price=1.0, total=1.0)]
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            async with async_session() as session:
+                await create(session, payload)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(sales)))
+    elapsed = time.perf_counter() - started
+
+    lost_updates = await current_quantity(product_id) - (initial_quantity - sales)
+
+    print(
+        f"{name:>14}: {sales} sales in {elapsed:.2f}s "
+        f"({sales / elapsed:.1f} sales/s), lost updates: {lost_updates}"
+    )
+
+async def main(sales: int, concurrency: int):
+    await run("legacy", legacy_create_sale, sales, concurrency)
+    await run("transactional", transactional_create_sale, sales, concurrency)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sales", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sales, args.concurrency))
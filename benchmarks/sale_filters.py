@@ -0,0 +1,103 @@
+"""
+Benchmark of product/category sale filters.
+
+For every category (from the least to the most popular) compares the
+previous approach, which fetched every matching sale id into Python and sent
+it back as an IN list, with the EXISTS semi-join used by the endpoints now.
+Reports latency and peak Python memory against the number of matching sales.
+
+    python benchmarks/sale_filters.py --repeat 5
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+import tracemalloc
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from app.database import async_session, engine
+from app.models.category import Category
+from app.models.product import Product
+from app.models.sale import Sale, SaleItem
+from app.services.sale_service import SaleService
+
+PAGE_SIZE = 100
+
+async def in_list_page(db, category_id):
+    sale_id_query = select(SaleItem.sale_id).distinct().join(
+        Product, SaleItem.product_id == Product.id
+    ).filter(Product.category_id == category_id)
+
+    sale_id_result = await db.execute(sale_id_query)
+    sale_ids = [row[0] for row in sale_id_result]
+
+    if not sale_ids:
+        return []
+
+    result = await db.execute(
+        select(Sale.id).filter(Sale.id.in_(sale_ids)).order_by(Sale.created_at.desc()).limit(PAGE_SIZE)
+    )
+    return result.scalars().all()
+
+async def semi_join_page(db, category_id):
+    result = await db.execute(
+        select(Sale.id)
+        .filter(SaleService.item_filter(category_id=category_id))
+        .order_by(Sale.created_at.desc())
+        .limit(PAGE_SIZE)
+    )
+    return result.scalars().all()
+
+async def measure(page, category_id, repeat):
+    timings = []
+    peak = 0
+
+    for _ in range(repeat):
+        async with async_session() as session:
+            tracemalloc.start()
+            started = time.perf_counter()
+            await page(session, category_id)
+            timings.append(time.perf_counter() - started)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    return sorted(timings)[len(timings) // 2], peak
+
+async def main(repeat: int):
+    async with async_session() as session:
+        matches = func.count(func.distinct(SaleItem.sale_id))
+        result = await session.execute(
+            select(Category.id, Category.name, matches.label("matches"))
+            .join(Product, Product.category_id == Category.id)
+            .join(SaleItem, SaleItem.product_id == Product.id)
+            .group_by(Category.id, Category.name)
+            .order_by(matches)
+        )
+        categories = result.fetchall()
+
+    print(f"{'category':<28}{'matches':>10}{'in-list ms':>12}{'in-list KiB':>13}{'exists ms':>11}{'exists KiB':>12}")
+
+    for category in categories:
+        in_list_time, in_list_memory = await measure(in_list_page, category.id, repeat)
+        exists_time, exists_memory = await measure(semi_join_page, category.id, repeat)
+
+        print(
+            f"{category.name[:27]:<28}{category.matches:>10}"
+            f"{in_list_time * 1000:>12.1f}{in_list_memory / 1024:>13.0f}"
+            f"{exists_time * 1000:>11.1f}{exists_memory / 1024:>12.0f}"
+        )
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.repeat))
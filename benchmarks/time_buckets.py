@@ -0,0 +1,102 @@
+"""
+Benchmark of revenue time bucketing on the raw sales table.
+
+Compares the session-timezone DATE()/DATE_TRUNC grouping, which returns only
+the buckets with sales, against timezone-aware buckets densified with
+generate_series in the same statement. The client-side equivalent of the
+latter (filling gaps in Python) is timed on top of the sparse query. Also
+reports whether each plan reaches sales through the created_at index.
+Run it against a large table (see the seed/generator scripts):
+
+    python benchmarks/time_buckets.py --days 365 --tz America/New_York --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.database import async_session, engine
+from app.schemas.analytics import TimeFrame
+from app.services.analytics_backends import RawAnalyticsBackend
+
+def variants(start, end, tz):
+    zone = ZoneInfo(tz)
+    local_start, local_end = start.replace(tzinfo=zone), end.replace(tzinfo=zone)
+
+    return {
+        "cast grouping, sparse": lambda backend: backend._series_query(start, end, TimeFrame.DAILY),
+        "tz buckets, gap-filled": lambda backend: backend._series_query(
+            local_start, local_end, TimeFrame.DAILY, tz, fill_gaps=True
+        ),
+    }
+
+async def measure(build, repeat, densify_from=None):
+    timings = []
+    rows = []
+
+    for _ in range(repeat):
+        async with async_session() as session:
+            query = build(RawAnalyticsBackend(session))
+            started = time.perf_counter()
+            rows = (await session.execute(query)).fetchall()
+
+            if densify_from:
+                rows = _densify(rows, *densify_from)
+
+            timings.append(time.perf_counter() - started)
+
+    return sorted(timings)[len(timings) // 2], len(rows)
+
+async def uses_index(build):
+    async with async_session() as session:
+        query = build(RawAnalyticsBackend(session))
+        compiled = query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+        plan = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+
+    return "ix_sales_created_at_id" in json.dumps(plan)
+
+def _densify(rows, start, end):
+    by_date = {row.date: row for row in rows}
+    day, filled = start.date(), []
+
+    while day <= end.date():
+        row = by_date.get(day)
+        filled.append((day, row.revenue if row else 0, row.count if row else 0))
+        day += timedelta(days=1)
+
+    return filled
+
+async def main(days: int, tz: str, repeat: int):
+    end = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(microseconds=1)
+    start = end - timedelta(days=days) + timedelta(microseconds=1)
+    builds = variants(start, end, tz)
+
+    print(f"{'variant':<32}{'median ms':>12}{'buckets':>10}  index")
+
+    for label, build in builds.items():
+        elapsed, count = await measure(build, repeat)
+        print(f"{label:<32}{elapsed * 1000:>12.1f}{count:>10}  {await uses_index(build)}")
+
+    elapsed, count = await measure(builds["cast grouping, sparse"], repeat, densify_from=(start, end))
+    print(f"{'cast grouping + client fill':<32}{elapsed * 1000:>12.1f}{count:>10}  -")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--tz", default="UTC")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.days, args.tz, args.repeat))
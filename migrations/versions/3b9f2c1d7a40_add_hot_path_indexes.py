@@ -0,0 +1,52 @@
+"""add hot path indexes
+
+Foreign key indexes plus covering and partial indexes for the analytics,
+sales filtering and low-stock queries. Indexes are built CONCURRENTLY so
+the migration does not block writes on a live database.
+
+Revision ID: 3b9f2c1d7a40
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9f2c1d7a40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_sale_items_sale_id", "sale_items (sale_id)"),
+    ("ix_sale_items_product_id_sale_id", "sale_items (product_id, sale_id) INCLUDE (quantity, total)"),
+    ("ix_products_category_id", "products (category_id)"),
+    ("ix_inventory_changes_inventory_id_created_at", "inventory_changes (inventory_id, created_at, id)"),
+    ("ix_sales_created_at_id", "sales (created_at, id) INCLUDE (total_amount)"),
+    ("ix_inventory_low_stock", "inventory (product_id) WHERE quantity < low_stock_threshold"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+        # Superseded by ix_sales_created_at_id
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_sales_created_at")
+
+    op.execute("ANALYZE sales")
+    op.execute("ANALYZE sale_items")
+    op.execute("ANALYZE products")
+    op.execute("ANALYZE inventory")
+    op.execute("ANALYZE inventory_changes")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sales_created_at ON sales (created_at)")
+
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,86 @@
+"""add daily rollup tables
+
+Creates the daily revenue, category and product rollup tables that sale
+writes maintain, and backfills them from the sales tables. Rollups are
+derived data, so copies created earlier by create_all (without the revenue
+shard column) are dropped and rebuilt.
+
+Revision ID: 8c1e5a0f4b27
+Revises: 3b9f2c1d7a40
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1e5a0f4b27'
+down_revision = '3b9f2c1d7a40'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ["daily_product_revenue_rollup", "daily_category_revenue_rollup", "daily_revenue_rollup"]
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {table}")
+
+    op.create_table(
+        "daily_revenue_rollup",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("shard", sa.SmallInteger(), primary_key=True, server_default="0"),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("sale_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "daily_category_revenue_rollup",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), primary_key=True),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("quantity", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sale_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "daily_product_revenue_rollup",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), primary_key=True),
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("quantity", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sale_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Same bucketing as RollupService: DATE(created_at) in the session timezone
+    op.execute("""
+        INSERT INTO daily_revenue_rollup (day, shard, revenue, sale_count)
+        SELECT DATE(created_at), 0, SUM(total_amount), COUNT(id)
+        FROM sales
+        GROUP BY DATE(created_at)
+    """)
+    op.execute("""
+        INSERT INTO daily_category_revenue_rollup (day, category_id, revenue, quantity, sale_count)
+        SELECT DATE(sales.created_at), products.category_id, SUM(sale_items.total),
+               SUM(sale_items.quantity), COUNT(DISTINCT sales.id)
+        FROM sales
+        JOIN sale_items ON sale_items.sale_id = sales.id
+        JOIN products ON products.id = sale_items.product_id
+        GROUP BY DATE(sales.created_at), products.category_id
+    """)
+    op.execute("""
+        INSERT INTO daily_product_revenue_rollup (day, product_id, revenue, quantity, sale_count)
+        SELECT DATE(sales.created_at), sale_items.product_id, SUM(sale_items.total),
+               SUM(sale_items.quantity), COUNT(DISTINCT sales.id)
+        FROM sales
+        JOIN sale_items ON sale_items.sale_id = sales.id
+        GROUP BY DATE(sales.created_at), sale_items.product_id
+    """)
+
+    for table in reversed(TABLES):
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_table(table)
@@ -0,0 +1,30 @@
+"""add category updated_at
+
+Categories are edited in place; their latest update time is part of the
+analytics data version behind the aligned responses' ETag.
+
+Revision ID: d41a7e93c5b8
+Revises: 8c1e5a0f4b27
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a7e93c5b8'
+down_revision = '8c1e5a0f4b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "categories",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("categories", "updated_at")
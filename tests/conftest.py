@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The tests recreate the schema, so they only ever run against the scratch
+# database named by TEST_DATABASE_URL, with reads kept on it as well
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+    os.environ["READ_DATABASE_URL"] = ""
@@ -0,0 +1,136 @@
+import asyncio
+import os
+
+import pytest
+
+if not os.environ.get("TEST_DATABASE_URL"):
+    pytest.skip("set TEST_DATABASE_URL to a scratch PostgreSQL database", allow_module_level=True)
+
+import httpx
+from sqlalchemy import event
+
+from app.database import Base, async_session, engine
+from app.main import app
+from app.models.category import Category
+from app.models.product import Product
+from app.models.sale import Sale, SaleItem, PaymentMethod
+
+SIZES = [1, 10, 100]
+
+async def seed(count: int) -> int:
+    """
+    Recreate the schema with ``count`` sales of one to three items each;
+    returns the id of the last sale
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        category = Category(name="Test category")
+        session.add(category)
+        await session.flush()
+
+        products = [
+            Product(sku=f"TEST-{index}", name=f"Test product {index}", price=10.0, cost=5.0, category_id=category.id)
+            for index in range(3)
+        ]
+        session.add_all(products)
+        await session.flush()
+
+        sales = [
+            Sale(
+                reference_number=f"TEST-{index}",
+                total_amount=10.0 * (index % 3 + 1),
+                payment_method=PaymentMethod.CASH,
+                items=[
+                    SaleItem(product_id=product.id, quantity=1, price=10.0, total=10.0)
+                    for product in products[:index % 3 + 1]
+                ]
+            )
+            for index in range(count)
+        ]
+        session.add_all(sales)
+        await session.commit()
+
+        return sales[-1].id
+
+def expected_product_names(reference_number: str) -> list:
+    # Sale TEST-<index> was seeded with the first index % 3 + 1 products
+    index = int(reference_number.split("-")[1])
+
+    return [f"Test product {product}" for product in range(index % 3 + 1)]
+
+def assert_items_loaded(sales: list):
+    """
+    Every sale comes back with all its items and their product names, so a
+    lost eager load fails here even when the statement counts still match
+    """
+    assert sales
+
+    for sale in sales:
+        names = sorted(item["product_name"] for item in sale["items"] if item["product_name"])
+
+        assert len(sale["items"]) == len(expected_product_names(sale["reference_number"])), sale
+        assert names == expected_product_names(sale["reference_number"]), sale
+
+async def count_statements(client, method: str, url: str, **kwargs):
+    """
+    The statements the request issued and its JSON response
+    """
+    statements = 0
+
+    def before_cursor_execute(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        response = await client.request(method, url, **kwargs)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 200, response.text
+
+    return statements, response.json()
+
+def statement_counts(request) -> list:
+    """
+    Statements issued by ``request(size, sale_id)`` after seeding each size,
+    checking the sales returned
+    """
+    async def run(size):
+        try:
+            sale_id = await seed(size)
+
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                method, url, kwargs = request(size, sale_id)
+                statements, body = await count_statements(client, method, url, **kwargs)
+        finally:
+            await engine.dispose()
+
+        sales = body if isinstance(body, list) else [body]
+        assert_items_loaded(sales)
+
+        if isinstance(body, list):
+            assert len(sales) == size
+
+        return statements
+
+    return [asyncio.run(run(size)) for size in SIZES]
+
+def test_get_sales_statements_do_not_grow_with_page_size():
+    counts = statement_counts(lambda size, sale_id: ("GET", f"/api/sales/?limit={size}", {}))
+
+    assert len(set(counts)) == 1, counts
+
+def test_filter_sales_statements_do_not_grow_with_page_size():
+    counts = statement_counts(lambda size, sale_id: ("POST", f"/api/sales/filter?limit={size}", {"json": {}}))
+
+    assert len(set(counts)) == 1, counts
+
+def test_get_sale_statements_do_not_grow_with_table_size():
+    counts = statement_counts(lambda size, sale_id: ("GET", f"/api/sales/{sale_id}", {}))
+
+    assert len(set(counts)) == 1, counts